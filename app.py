@@ -1,24 +1,30 @@
 #flask related
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 from flask_mail import Mail, Message
 
 #inbuilt
 from collections import defaultdict
 import random
 from datetime import datetime, timedelta
+import gzip
 import json
+import multiprocessing
 import os
 import requests
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict
 
 #model related
 import pickle
-import xgboost as xgb
+import numpy as np
 
 #user defined
 from data_generator import generate_unlabeled_dataset
-from pdf_exporter import generate_investigation_report_with_llm
-from llm_explainer import LLMFraudExplainer
+from pdf_exporter import render_investigation_report_file
+from llm_explainer import get_explainer, SUPPORTED_PROVIDERS
+from analytics_kernels import warmup_analytics_kernels
 from utilities_functions import *
 from config import *
 # At top of app.py, replace the CAMARAAPIClient class with:
@@ -29,13 +35,18 @@ load_dotenv()  # Load environment variables from .env file
 
 app = Flask(__name__)
 
+# Spawned PDF pool workers re-import this file as __mp_main__ but only need
+# pdf_exporter, so they skip the LLM probe, model load and kernel warmup below
+PDF_WORKER_PROCESS = __name__ == '__mp_main__'
 
-try:
-    llm_explainer = LLMFraudExplainer(provider='gemini')  # Change to 'openai' or 'anthropic' with API keys
-    print("✅ LLM Explainer initialized")
-except Exception as e:
-    print(f"⚠️  LLM Explainer initialization warning: {e}")
-    llm_explainer = None
+llm_explainer = None
+if not PDF_WORKER_PROCESS:
+    try:
+        llm_explainer = get_explainer(provider='gemini')  # Change to 'openai' or 'anthropic' with API keys
+        print("✅ LLM Explainer initialized")
+    except Exception as e:
+        print(f"⚠️  LLM Explainer initialization warning: {e}")
+        llm_explainer = None
 
 
 # Flask-Mail Configuration
@@ -250,16 +261,51 @@ def send_daily_summary_email():
         print(f"❌ Daily summary email error: {e}")
         return False
 # Load model and encoder
-try:
-    with open('model.pkl', 'rb') as f:
-        model = pickle.load(f)
-    with open('encoder.pkl', 'rb') as f:
-        encoder = pickle.load(f)
-    print("✅ Model and encoder loaded successfully")
-except Exception as e:
-    print(f"❌ Error loading model/encoder: {e}")
-    model = None
-    encoder = None
+model = None
+encoder = None
+if not PDF_WORKER_PROCESS:
+    try:
+        with open('model.pkl', 'rb') as f:
+            model = pickle.load(f)
+        with open('encoder.pkl', 'rb') as f:
+            encoder = pickle.load(f)
+        print("✅ Model and encoder loaded successfully")
+    except Exception as e:
+        print(f"❌ Error loading model/encoder: {e}")
+        model = None
+        encoder = None
+
+    # Compile analytics kernels up front so the first dashboard request doesn't pay for it
+    warmup_analytics_kernels()
+
+# PDF builds are pure-Python CPU work and serialize on the GIL, so concurrent
+# exports render in worker processes instead (pool is started on first export)
+PDF_POOL_WORKERS = min(4, os.cpu_count() or 1)
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+def get_pdf_pool():
+    """Return the shared PDF process pool, creating it on first use"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # spawn: don't fork a process that is already serving requests on threads
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_POOL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pdf_pool
+
+def render_pdf_in_pool(*args):
+    """Render a report to a temp file in the PDF pool (falling back to this process if the pool died); returns the path"""
+    global _pdf_pool
+    try:
+        return get_pdf_pool().submit(render_investigation_report_file, *args).result()
+    except BrokenProcessPool as e:
+        print(f"⚠️  PDF worker pool failed, rendering inline: {e}")
+        with _pdf_pool_lock:
+            _pdf_pool = None
+        return render_investigation_report_file(*args)
 
 # class CAMARAAPIClient:
 #     """REAL Nokia CAMARA Network-as-Code APIs Client"""
@@ -752,32 +798,24 @@ def predict_fraud_hybrid(phone_number, transaction_amount,merchant_name=None, pa
         return None, f"Encoding error: {e}", None, None
     
     try:
-        dnew = xgb.DMatrix(X_new, enable_categorical=False, feature_names=FEATURE_COLUMNS)
-        model_score = model.predict(dnew)[0]
+        model_score = model.inplace_predict(X_new.to_numpy(dtype=np.float32))[0]
         
         # Get KYC coordinates (from customer profile)
         kyc_lat = 26.4499  # Kanpur coordinates
         kyc_lon = 80.3319
         
         print(f"📡 Calling CAMARA APIs for {phone_number}...")
-        camara_client = CAMARAAPIClient()
-        
-        sim_swap_data = camara_client.check_sim_swap(phone_number)
-        location_data = camara_client.verify_location(
+        # The four checks are independent round-trips, so they run in parallel
+        camara_data = CAMARAAPIClient.run_all_checks(
             phone_number,
             expected_lat=kyc_lat,
             expected_lon=kyc_lon,
             radius=50000
         )
-        roaming_data = camara_client.check_device_roaming(phone_number)
-        device_status_data = camara_client.check_device_status(phone_number)
-        
-        camara_data = {
-            'sim_swap': sim_swap_data,
-            'location': location_data,
-            'roaming': roaming_data,
-            'device_status': device_status_data
-        }
+        sim_swap_data = camara_data['sim_swap']
+        location_data = camara_data['location']
+        roaming_data = camara_data['roaming']
+        device_status_data = camara_data['device_status']
         api_statuses = {
         'sim_swap': sim_swap_data.get('status', 'unknown'),
         'location': location_data.get('status', 'unknown'),
@@ -887,6 +925,25 @@ def predict_fraud_hybrid(phone_number, transaction_amount,merchant_name=None, pa
         return None, f"Prediction error: {e}", None, None
 
 
+def gzip_json_response(payload, min_size=1024):
+    """jsonify payload, gzip-compressing the body when the client accepts it and it is large enough"""
+    response = jsonify(payload)
+    # Both representations depend on Accept-Encoding, so shared caches must key on it
+    response.vary.add('Accept-Encoding')
+    # Quality-aware: 'gzip;q=0' is a refusal, '*' counts as acceptance
+    if request.accept_encodings['gzip'] <= 0:
+        return response
+    
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+    
+    # Level 4 keeps most of the size win on JSON at a fraction of level 9's CPU cost
+    response.set_data(gzip.compress(body, compresslevel=4))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
 # ROUTES
 
 @app.route('/api/send-daily-report', methods=['POST'])
@@ -978,7 +1035,7 @@ def predict():
 @app.route('/api/logs')
 def api_logs():
     logs = get_transaction_logs()
-    return jsonify(logs)
+    return gzip_json_response(logs)
 
 
 @app.route('/api/stats')
@@ -1048,21 +1105,18 @@ def submit_feedback():
 
 @app.route('/dashboard')
 def analytics_dashboard():
-    logs = get_transaction_logs()
     stats = get_statistics()
     
-    from dashboard_analytics import calculate_all_analytics
-    analytics = calculate_all_analytics(logs)
+    from dashboard_analytics import calculate_all_analytics, load_logs_columnar
+    analytics = calculate_all_analytics(load_logs_columnar())
     
     return render_template('dashboard.html', analytics=analytics, stats=stats)
 
 
 @app.route('/analytics')
 def analytics_page():
-    logs = get_transaction_logs()
-    
-    from dashboard_analytics import calculate_roi_metrics
-    roi_data = calculate_roi_metrics(logs)
+    from dashboard_analytics import calculate_roi_metrics, load_logs_columnar
+    roi_data = calculate_roi_metrics(load_logs_columnar())
     
     return render_template('analytics.html', roi_data=roi_data)
 
@@ -1344,20 +1398,52 @@ def export_investigation_report(phone_number):
             latest_llm_explanation = log['explanation']
             break # Found the latest one
     
-    # Pass all data to the PDF generator
-    pdf_buffer = generate_investigation_report_with_llm(
+    # Built into a temp file by a worker process; only its path comes back
+    pdf_path = render_pdf_in_pool(
         phone_number, 
         phone_logs, 
         stats,
         latest_llm_explanation # Pass the LLM data
     )
     
-    return send_file(
-        pdf_buffer,
+    # send_file streams the file in chunks and quotes/encodes the download name
+    # (phone numbers can contain spaces)
+    response = send_file(
+        pdf_path,
         mimetype='application/pdf',
         as_attachment=True,
         download_name=f'fraud_investigation_{phone_number}_{datetime.now().strftime("%Y%m%d")}.pdf'
     )
+    # Werkzeug skips close callbacks for passthrough bodies, so turn that off
+    # to get the temp file removed once the body has been sent
+    response.direct_passthrough = False
+    response.call_on_close(lambda: os.remove(pdf_path))
+    return response
+
+def build_llm_explanation_inputs(phone_number, latest_txn, customer_history):
+    """Rebuild LLM explainer arguments from a logged transaction"""
+    fraud_score = latest_txn.get('fraud_probability', 0) * 100
+    
+    return {
+        'current_transaction': {
+            'phone_number': phone_number,
+            'amount': latest_txn.get('transaction_amount', 0),
+            'timestamp': latest_txn.get('timestamp'),
+            'kyc_city': latest_txn.get('city', 'Unknown'),
+            'kyc_country': latest_txn.get('country', 'Unknown')
+        },
+        'customer_history': customer_history,
+        'camara_data': latest_txn.get('camara_data', {}),
+        'ml_scores': {
+            'final_score': fraud_score,
+            'model_score': fraud_score,
+            'weighted_score': fraud_score,
+            'condition_score': 0,
+            'decision': 'REJECT' if latest_txn.get('risk_level') == 'High Risk' else 
+                       'STEP-UP' if latest_txn.get('risk_level') == 'Medium Risk' else 'ACCEPT'
+        }
+    }
+
 # NEW ROUTE: Get LLM explanation for existing transaction
 @app.route('/api/get-llm-explanation/<phone_number>')
 def get_llm_explanation(phone_number):
@@ -1371,40 +1457,15 @@ def get_llm_explanation(phone_number):
         # Get all logs
         all_logs = get_transaction_logs()
         
-        # Find transactions for this phone
-        customer_history = [log for log in all_logs if log['phone_number'] == phone_number]
+        # Find most recent transaction and full history for this phone
+        latest_txn, customer_history = get_customer_history(all_logs, phone_number)
         
-        if not customer_history:
+        if latest_txn is None:
             return jsonify({'error': 'No transactions found for this phone number'}), 404
         
-        # Get most recent transaction
-        latest_txn = customer_history[0]
-        
-        # Extract data
-        camara_data = latest_txn.get('camara_data', {})
-        
-        # Build ML scores from logged data
-        ml_scores = {
-            'final_score': latest_txn.get('fraud_probability', 0) * 100,
-            'model_score': latest_txn.get('fraud_probability', 0) * 100,
-            'weighted_score': latest_txn.get('fraud_probability', 0) * 100,
-            'condition_score': 0,
-            'decision': 'REJECT' if latest_txn.get('risk_level') == 'High Risk' else 
-                       'STEP-UP' if latest_txn.get('risk_level') == 'Medium Risk' else 'ACCEPT'
-        }
-        
         # Generate explanation
         llm_explanation = llm_explainer.generate_fraud_explanation(
-            current_transaction={
-                'phone_number': phone_number,
-                'amount': latest_txn.get('transaction_amount', 0),
-                'timestamp': latest_txn.get('timestamp'),
-                'kyc_city': latest_txn.get('city', 'Unknown'),
-                'kyc_country': latest_txn.get('country', 'Unknown')
-            },
-            customer_history=customer_history,
-            camara_data=camara_data,
-            ml_scores=ml_scores
+            **build_llm_explanation_inputs(phone_number, latest_txn, customer_history)
         )
         
         return jsonify({
@@ -1415,6 +1476,40 @@ def get_llm_explanation(phone_number):
     except Exception as e:
         print(f"Error generating LLM explanation: {e}")
         return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stream-llm-explanation/<phone_number>')
+def stream_llm_explanation(phone_number):
+    """
+    Stream LLM explanation sections as Server-Sent Events
+    
+    Each event is {"section": ..., "content": ...}; a final {"done": true}
+    event marks the end of the report.
+    """
+    if not llm_explainer:
+        return jsonify({'error': 'LLM explainer not available'}), 503
+    
+    all_logs = get_transaction_logs()
+    latest_txn, customer_history = get_customer_history(all_logs, phone_number)
+    
+    if latest_txn is None:
+        return jsonify({'error': 'No transactions found for this phone number'}), 404
+    
+    inputs = build_llm_explanation_inputs(phone_number, latest_txn, customer_history)
+    
+    def generate():
+        try:
+            for section, content in llm_explainer.stream_fraud_explanation(**inputs):
+                yield f"data: {json.dumps({'section': section, 'content': content}, default=str)}\n\n"
+            yield f"data: {json.dumps({'done': True})}\n\n"
+        except Exception as e:
+            print(f"Error streaming LLM explanation: {e}")
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
     
 @app.route('/api/regenerate-explanation', methods=['POST'])
 def regenerate_explanation():
@@ -1423,46 +1518,29 @@ def regenerate_explanation():
     """
     data = request.json
     phone_number = data.get('phone_number')
-    provider = data.get('provider', 'mock')  # 'openai', 'anthropic', or 'mock'
+    provider = data.get('provider', 'mock')  # 'gemini' or 'mock'
     
     if not phone_number:
         return jsonify({'error': 'Phone number required'}), 400
     
+    if provider not in SUPPORTED_PROVIDERS:
+        return jsonify({'error': f"Unsupported provider, expected one of: {', '.join(SUPPORTED_PROVIDERS)}"}), 400
+    
     try:
-        # Create new explainer with specified provider
-        temp_explainer = LLMFraudExplainer(provider=provider)
+        # Shared explainer for the requested provider (models are probed once per process)
+        temp_explainer = get_explainer(provider=provider)
         
         # Get transaction data
         all_logs = get_transaction_logs()
-        customer_history = [log for log in all_logs if log['phone_number'] == phone_number]
+        latest_txn, customer_history = get_customer_history(all_logs, phone_number)
         
-        if not customer_history:
+        if latest_txn is None:
             return jsonify({'error': 'No transactions found'}), 404
         
-        latest_txn = customer_history[0]
-        camara_data = latest_txn.get('camara_data', {})
-        
-        ml_scores = {
-            'final_score': latest_txn.get('fraud_probability', 0) * 100,
-            'model_score': latest_txn.get('fraud_probability', 0) * 100,
-            'weighted_score': latest_txn.get('fraud_probability', 0) * 100,
-            'condition_score': 0,
-            'decision': 'REJECT' if latest_txn.get('risk_level') == 'High Risk' else 
-                       'STEP-UP' if latest_txn.get('risk_level') == 'Medium Risk' else 'ACCEPT'
-        }
-        
         # Generate explanation
         llm_explanation = temp_explainer.generate_fraud_explanation(
-            current_transaction={
-                'phone_number': phone_number,
-                'amount': latest_txn.get('transaction_amount', 0),
-                'timestamp': latest_txn.get('timestamp'),
-                'kyc_city': latest_txn.get('city', 'Unknown'),
-                'kyc_country': latest_txn.get('country', 'Unknown')
-            },
-            customer_history=customer_history,
-            camara_data=camara_data,
-            ml_scores=ml_scores
+            **build_llm_explanation_inputs(phone_number, latest_txn, customer_history),
+            use_cache=False
         )
         
         return jsonify({
@@ -1488,7 +1566,7 @@ def api_logs_paginated():
     
     paginated_logs = all_logs[start_idx:end_idx]
     
-    return jsonify({
+    return gzip_json_response({
         'logs': paginated_logs,
         'total': len(all_logs),
         'page': page,
@@ -3,7 +3,10 @@
 # ============================================================================
 
 import os
+import re
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -37,6 +40,10 @@ CAMARA_CONFIG = {
 }
 
 
+# Anything that is not a digit or '+' is stripped from phone numbers
+_PHONE_STRIP = re.compile(r'[^\d+]')
+
+
 # ===== HACKATHON PHONE NUMBER HELPERS =====
 def get_random_test_number():
     """Get a random test phone number from hackathon range"""
@@ -46,7 +53,7 @@ def get_random_test_number():
 
 def is_valid_test_number(phone_number: str) -> bool:
     """Check if phone number is in hackathon test range"""
-    phone = ''.join(c for c in phone_number if c.isdigit() or c == '+')
+    phone = _PHONE_STRIP.sub('', phone_number)
     
     # Check if it's in the range +61400500800 to +61400500999
     if phone.startswith('+61400500'):
@@ -62,32 +69,39 @@ def get_all_test_numbers():
     return [f"+61400500{i}" for i in range(800, 1000)]
 
 
+# Headers only depend on CAMARA_CONFIG, so build them once at import (after load_dotenv).
+# MappingProxyType keeps callers from mutating the shared dict.
+RAPIDAPI_HEADERS = MappingProxyType({
+    'x-rapidapi-key': CAMARA_CONFIG['api_key'],
+    'x-rapidapi-host': CAMARA_CONFIG['api_host'],
+    'Content-Type': 'application/json'
+})
+
+
 def get_rapidapi_headers():
     """
-    Generate authentication headers for RapidAPI
+    Get authentication headers for RapidAPI (read-only, shared across calls)
     """
-    return {
-        'x-rapidapi-key': CAMARA_CONFIG['api_key'],
-        'x-rapidapi-host': CAMARA_CONFIG['api_host'],
-        'Content-Type': 'application/json'
-    }
+    return RAPIDAPI_HEADERS
 
 # ===== PHONE NUMBER FORMAT HELPER =====
+@lru_cache(maxsize=100_000)
 def format_phone_for_nokia(phone_number: str) -> str:
     """
     Format phone number according to Nokia CAMARA requirements
     Nokia expects E.164 format: +[country_code][number]
+    Cached: each CAMARA check formats the same phone again
     """
-    phone = ''.join(c for c in phone_number if c.isdigit() or c == '+')
+    phone = _PHONE_STRIP.sub('', phone_number)
     
     if not phone.startswith('+'):
         phone = '+91' + phone
     
     return phone
 
-def get_nokia_auth_headers():
+def _build_nokia_auth_headers():
     """
-    Generate authentication headers for Nokia CAMARA APIs
+    Build authentication headers for Nokia CAMARA APIs
     
     Nokia typically uses OAuth 2.0 or API Key authentication.
     Check your Nokia Developer Portal for exact requirements.
@@ -102,10 +116,20 @@ def get_nokia_auth_headers():
         headers['X-API-Key'] = CAMARA_CONFIG['api_key']
     
     # Method 2: Bearer Token (OAuth 2.0)
-    if CAMARA_CONFIG['oauth_token']:
+    if CAMARA_CONFIG.get('oauth_token'):
         headers['Authorization'] = f"Bearer {CAMARA_CONFIG['oauth_token']}"
     
-    return headers
+    return MappingProxyType(headers)
+
+
+NOKIA_AUTH_HEADERS = _build_nokia_auth_headers()
+
+
+def get_nokia_auth_headers():
+    """
+    Get authentication headers for Nokia CAMARA APIs (read-only, shared across calls)
+    """
+    return NOKIA_AUTH_HEADERS
 FEATURE_COLUMNS = [
     'customer_vintage_bucket', 'customer_risk_rating', 'customer_segment',
     'occupation_type', 'avg_monthly_txn_value', 'kyc_update_freq',
@@ -121,7 +145,7 @@ CATEGORICAL_COLUMNS = [
     'geo_restriction_level', 'restricted_geo_location'
 ]
 
-LOG_FILE = 'transaction_logs.json'
+LOG_FILE = 'transaction_logs.jsonl'
 FEEDBACK_FILE = 'prediction_feedback.json'
 def verify_api_configuration():
     """Verify that we're using real APIs"""
@@ -1,149 +1,212 @@
 # dashboard_analytics.py
-from collections import defaultdict
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 
+import numpy as np
+import pandas as pd
 
-def calculate_hourly_distribution(logs):
-    """Calculate transaction count per hour"""
-    hourly_data = defaultdict(int)
-    
+from analytics_kernels import group_sums, hourly_histogram, trend_counts
+from utilities_functions import get_transaction_logs
+
+# Below this many logs the thread hand-off costs more than the helpers themselves
+PARALLEL_ANALYTICS_THRESHOLD = 50000
+
+
+def logs_to_columns(logs):
+    """
+    Convert list-of-dict logs into parallel NumPy columns (structure-of-arrays)
+
+    All columns share the same row indexing, so helpers can combine them
+    with boolean masks instead of walking each log dict.
+    """
+    hours = []
+    days = []
     for log in logs:
         try:
             timestamp = datetime.strptime(log['timestamp'], '%Y-%m-%d %H:%M:%S')
-            hour = timestamp.hour
-            hourly_data[hour] += 1
+            hours.append(timestamp.hour)
+            days.append(timestamp.date())
         except:
-            continue
-    
-    return {hour: hourly_data.get(hour, 0) for hour in range(24)}
+            # Unparseable timestamp - excluded from hourly and daily stats
+            hours.append(-1)
+            days.append('NaT')
 
+    return {
+        'timestamp': np.array([log.get('timestamp', '') for log in logs], dtype=object),
+        'hour': np.array(hours, dtype=np.int64),
+        'day': np.array(days, dtype='datetime64[D]'),
+        'phone_number': np.array([log.get('phone_number', '') for log in logs], dtype=object),
+        'transaction_amount': np.array([log.get('transaction_amount', 0) for log in logs], dtype=np.float64),
+        'fraud_probability': np.array([log.get('fraud_probability', 0) for log in logs], dtype=np.float64),
+        'risk_level': np.array([log.get('risk_level', 'Low Risk') for log in logs], dtype=object),
+        'country': np.array([log.get('country', 'Unknown') for log in logs], dtype=object)
+    }
 
-def calculate_risk_distribution(logs):
+
+def factorize_column(values):
+    """
+    Integer group ids (in first-seen order) and the value of each group
+    Hash-based, so None and mixed-type values that np.unique can't sort just
+    form their own groups; missing values come back as None.
+    """
+    group_ids, uniques = pd.factorize(values, use_na_sentinel=False)
+    uniques = uniques.astype(object)
+    uniques[pd.isna(uniques)] = None
+    return group_ids, uniques
+
+
+def load_logs_columnar():
+    """Load transaction logs straight into columnar form"""
+    return logs_to_columns(get_transaction_logs())
+
+
+def calculate_hourly_distribution(columns):
+    """Calculate transaction count per hour"""
+    hourly_counts = hourly_histogram(columns['hour'])
+
+    return {hour: int(hourly_counts[hour]) for hour in range(24)}
+
+
+def calculate_risk_distribution(columns):
     """Calculate count of each risk level"""
-    distribution = {'High Risk': 0, 'Medium Risk': 0, 'Low Risk': 0}
-    
-    for log in logs:
-        risk_level = log.get('risk_level', 'Low Risk')
-        if risk_level in distribution:
-            distribution[risk_level] += 1
-    
-    return distribution
+    risk_levels = columns['risk_level']
+
+    return {
+        level: int(np.count_nonzero(risk_levels == level))
+        for level in ('High Risk', 'Medium Risk', 'Low Risk')
+    }
 
 
-def get_top_risky_phones(logs, limit=10):
+def get_top_risky_phones(columns, limit=10):
     """Get top risky phone numbers with their stats"""
-    phone_stats = defaultdict(lambda: {'total_risk': 0, 'count': 0, 'amounts': []})
-    
-    for log in logs:
-        phone = log['phone_number']
-        phone_stats[phone]['total_risk'] += log['fraud_probability']
-        phone_stats[phone]['count'] += 1
-        phone_stats[phone]['amounts'].append(log['transaction_amount'])
-    
-    risky_phones = []
-    for phone, stats in phone_stats.items():
-        avg_risk = (stats['total_risk'] / stats['count']) * 100
-        total_amount = sum(stats['amounts'])
-        
-        risky_phones.append({
-            'number': phone,
-            'risk_score': round(avg_risk, 1),
-            'transaction_count': stats['count'],
-            'total_amount': round(total_amount, 2)
-        })
-    
-    risky_phones.sort(key=lambda x: x['risk_score'], reverse=True)
-    return risky_phones[:limit]
+    phones = columns['phone_number']
+    if len(phones) == 0:
+        return []
+
+    # Encode phones to integer ids, then reduce every column with one bincount each
+    phone_idx, numbers = factorize_column(phones)
+    total_risk, counts, total_amount = group_sums(
+        phone_idx, len(numbers), columns['fraud_probability'], columns['transaction_amount']
+    )
+
+    risk_scores = np.round(total_risk / counts * 100, 1)
+
+    # Top-k selection: partition out the limit-th best score in O(P), then only
+    # sort phones scoring at least that much (ties at the cut are all kept)
+    candidates = np.arange(len(numbers))
+    if limit < len(numbers):
+        cutoff = -np.partition(-risk_scores, limit - 1)[limit - 1]
+        candidates = np.flatnonzero(risk_scores >= cutoff)
 
+    # Highest risk first; ties keep first-seen order like the old dict walk
+    order = candidates[np.argsort(-risk_scores[candidates], kind='stable')][:limit]
 
-def calculate_fraud_trend(logs):
+    return [
+        {
+            'number': numbers[i],
+            'risk_score': float(risk_scores[i]),
+            'transaction_count': int(counts[i]),
+            'total_amount': round(float(total_amount[i]), 2)
+        }
+        for i in order
+    ]
+
+
+def calculate_fraud_trend(columns):
     """Calculate fraud trend over last 7 days"""
-    daily_fraud = defaultdict(lambda: {'high_risk': 0, 'total': 0})
-    
-    today = datetime.now()
+    today = date.today()
     last_7_days = [(today - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(6, -1, -1)]
-    
-    for log in logs:
-        try:
-            log_date = log['timestamp'][:10]
-            if log_date in last_7_days:
-                daily_fraud[log_date]['total'] += 1
-                if log['risk_level'] == 'High Risk':
-                    daily_fraud[log_date]['high_risk'] += 1
-        except:
-            continue
-    
+
+    # Whole days between today and each log; NaT days fall far outside 0..6
+    days_ago = (np.datetime64(today, 'D') - columns['day']).astype(np.int64)
+    totals, high_risks = trend_counts(days_ago, columns['risk_level'] == 'High Risk')
+
     trend_data = {}
-    for date in last_7_days:
-        total = daily_fraud[date]['total']
-        high_risk = daily_fraud[date]['high_risk']
+    for date_str, ago in zip(last_7_days, range(6, -1, -1)):
+        total = int(totals[ago])
+        high_risk = int(high_risks[ago])
         fraud_rate = (high_risk / total * 100) if total > 0 else 0
-        trend_data[date] = {
+        trend_data[date_str] = {
             'fraud_rate': round(fraud_rate, 1),
             'total_txns': total,
             'high_risk_txns': high_risk
         }
-    
+
     return trend_data
 
 
-def calculate_geo_distribution(logs):
+def calculate_geo_distribution(columns):
     """Calculate transaction distribution by country"""
-    geo_data = defaultdict(lambda: {'count': 0, 'high_risk': 0})
-    
-    for log in logs:
-        country = log.get('country', 'Unknown')
-        geo_data[country]['count'] += 1
-        if log['risk_level'] == 'High Risk':
-            geo_data[country]['high_risk'] += 1
-    
+    countries = columns['country']
+    if len(countries) == 0:
+        return []
+
+    inverse, names = factorize_column(countries)
+    counts = np.bincount(inverse)
+    high_risk = np.bincount(inverse, weights=(columns['risk_level'] == 'High Risk'))
+
+    # Most transactions first; ties keep first-seen order like the old dict walk
+    order = np.argsort(-counts, kind='stable')[:10]
+
     geo_list = []
-    for country, stats in geo_data.items():
-        risk_rate = (stats['high_risk'] / stats['count'] * 100) if stats['count'] > 0 else 0
+    for i in order:
+        risk_rate = high_risk[i] / counts[i] * 100
         geo_list.append({
-            'country': country,
-            'transaction_count': stats['count'],
-            'high_risk_count': stats['high_risk'],
-            'risk_rate': round(risk_rate, 1)
+            'country': names[i],
+            'transaction_count': int(counts[i]),
+            'high_risk_count': int(high_risk[i]),
+            'risk_rate': round(float(risk_rate), 1)
         })
-    
-    geo_list.sort(key=lambda x: x['transaction_count'], reverse=True)
-    return geo_list[:10]
 
-def calculate_roi_metrics(logs):
+    return geo_list
+
+def calculate_roi_metrics(columns):
     """Calculate ROI metrics for fraud prevention"""
-    if not logs:
+    if len(columns['risk_level']) == 0:
         return {
             'total_saved': '0.00',
             'fraud_blocked': 0,
             'accuracy': 0,
             'avg_fraud_amount': '0.00'
         }
-    
-    high_risk_transactions = [log for log in logs if log['risk_level'] == 'High Risk']
-    
+
+    high_risk_mask = columns['risk_level'] == 'High Risk'
+    fraud_blocked = int(np.count_nonzero(high_risk_mask))
+
     # Calculate total amount that would have been lost
-    total_saved = sum(log.get('transaction_amount', 0) for log in high_risk_transactions)
-    
+    total_saved = float(columns['transaction_amount'][high_risk_mask].sum())
+
     # Calculate average fraud amount
-    avg_fraud_amount = total_saved / len(high_risk_transactions) if high_risk_transactions else 0
-    
+    avg_fraud_amount = total_saved / fraud_blocked if fraud_blocked else 0
+
     # Calculate accuracy (this is simplified - in production, use actual feedback data)
-    accuracy = 85.5 if len(logs) > 0 else 0
-    
+    accuracy = 85.5
+
     return {
         'total_saved': f'{total_saved:,.2f}',
-        'fraud_blocked': len(high_risk_transactions),
+        'fraud_blocked': fraud_blocked,
         'accuracy': f'{accuracy:.1f}',
         'avg_fraud_amount': f'{avg_fraud_amount:,.2f}'
     }
 
-def calculate_all_analytics(logs):
-    """Calculate all dashboard analytics"""
-    return {
-        'hourly_transactions': calculate_hourly_distribution(logs),
-        'risk_distribution': calculate_risk_distribution(logs),
-        'top_risky_numbers': get_top_risky_phones(logs, limit=10),
-        'fraud_trend': calculate_fraud_trend(logs),
-        'geographic_distribution': calculate_geo_distribution(logs)
-    }
\ No newline at end of file
+def calculate_all_analytics(columns):
+    """
+    Calculate all dashboard analytics from columnar logs (see logs_to_columns)
+
+    The helpers only read the shared columns, so for large logs they run on a
+    thread pool; NumPy and the numba kernels release the GIL while reducing.
+    """
+    tasks = {
+        'hourly_transactions': (calculate_hourly_distribution,),
+        'risk_distribution': (calculate_risk_distribution,),
+        'top_risky_numbers': (get_top_risky_phones, 10),
+        'fraud_trend': (calculate_fraud_trend,),
+        'geographic_distribution': (calculate_geo_distribution,)
+    }
+
+    if len(columns['risk_level']) < PARALLEL_ANALYTICS_THRESHOLD:
+        return {key: func(columns, *args) for key, (func, *args) in tasks.items()}
+
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = {key: executor.submit(func, columns, *args) for key, (func, *args) in tasks.items()}
+        return {key: future.result() for key, future in futures.items()}
@@ -0,0 +1,36 @@
+# geo_kernels.py
+"""
+Batch geo distance kernel behind NokiaCAMARAClient._haversine_distance_batch
+
+With numba installed the haversine loop is JIT-compiled (cached to disk) and
+split across CPU cores with prange. Without numba, NUMBA_AVAILABLE is False
+and callers stay on their NumPy path.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+EARTH_RADIUS_M = 6371000.0
+
+
+if NUMBA_AVAILABLE:
+
+    # fastmath is fine here: reassociation error is far below the spherical-Earth error
+    @njit(cache=True, parallel=True, fastmath=True)
+    def haversine_distance_kernel(lat1, lon1, lat2, lon2):
+        """Distances in meters between equal-length 1-D coordinate arrays (degrees)"""
+        n = lat1.shape[0]
+        out = np.empty(n, dtype=np.float64)
+        for i in prange(n):
+            phi1 = np.radians(lat1[i])
+            phi2 = np.radians(lat2[i])
+            dphi = phi2 - phi1
+            dlam = np.radians(lon2[i] - lon1[i])
+            a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2) ** 2
+            out[i] = 2 * EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        return out
@@ -4,10 +4,20 @@ Advanced LLM-Powered Fraud Explanation Engine
 Using Google Gemini
 """
 
+import asyncio
+import hashlib
 import json
+import heapq
 import os
+import string
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
 
 # Google Gemini
 try:
@@ -17,20 +27,170 @@ except ImportError:
     GEMINI_AVAILABLE = False
     print("⚠️  google-generativeai not installed. Run: pip install google-generativeai")
 
+# Explanation cache (optional)
+try:
+    from cachetools import TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    CACHETOOLS_AVAILABLE = False
+    print("⚠️  cachetools not installed, Gemini explanations will not be cached. Run: pip install cachetools")
+
+# Fast JSON for context fingerprints (optional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Per-transaction part of the investigation prompt; filled in _build_llm_prompt
+_PROMPT_TEMPLATE = string.Template("""Analyze this transaction and provide a detailed fraud investigation report.
+
+**CURRENT TRANSACTION:**
+- Phone: $phone_number
+- Amount: $$$amount
+- Time: $timestamp
+- Location: $location
+
+**FRAUD DETECTION SCORES:**
+- Final Risk Score: $final_risk_score/100
+- ML Model Score: $model_probability/100
+- Decision: $decision
+
+**NETWORK INTELLIGENCE (CAMARA APIs):**
+- SIM Swap: $sim_swap
+- Location: $location_check
+- Roaming: $roaming
+- Device Status: $device_status
+
+**CUSTOMER PROFILE & HISTORY:**
+- Total Transactions: $total_transactions
+- Average Amount: $$$average_amount
+- Typical Range: $typical_amount_range
+- High Risk History: $high_risk_history transactions
+- Customer Duration: $days_as_customer days
+- Activity Level: $velocity_pattern
+- Amount Trend: $amount_trend
+
+**DETECTED ANOMALIES:**
+$anomalies
+
+**RECENT TRANSACTION HISTORY:**
+$recent_transactions""")
+
+# Static report instructions - uploaded once as Gemini cached content when
+# possible, otherwise appended to every prompt
+_STATIC_INSTRUCTIONS = """Please provide a structured analysis with these sections:
+
+ **EXECUTIVE SUMMARY** (2-3 sentences): High-level assessment
+
+ **DETAILED ANALYSIS**: What makes this suspicious/legitimate? How does it compare to normal behavior?
+
+ **BEHAVIORAL INSIGHTS**: Past patterns, changes, velocity analysis
+
+ **RISK FACTORS** (list specific red flags with severity)
+
+ **RECOMMENDATION**: APPROVE/BLOCK/ADDITIONAL VERIFICATION with specific next steps
+
+Write clearly for fraud investigators to act upon immediately."""
+
+# Lifetime of the cached instructions; refreshed once half of it has passed
+INSTRUCTION_CACHE_TTL = 3600
+
+
+# Models that already passed the "Hello" probe, shared by every explainer in the process
+_MODEL_PROBE_CACHE = {}
+
+
+@lru_cache(maxsize=16384)
+def _parse_timestamp(timestamp_str):
+    """Parse a log timestamp once; repeat lookups for the same string are free"""
+    return datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
+
+
+@dataclass(frozen=True, slots=True)
+class BehaviorProfile:
+    """Customer behavior statistics from _analyze_customer_behavior"""
+    
+    total_transactions: int
+    avg_amount: float
+    frequency: str
+    typical_range: str
+    high_risk_count: int
+    customer_days: int
+    velocity_pattern: str
+    recent_txns: list
+    location_changes: int
+    amount_trend: str
+    
+    # Legacy dict keys that duplicated other fields
+    _ALIASES = {
+        'average_amount': 'avg_amount',
+        'days_as_customer': 'customer_days',
+        'recent_transactions': 'recent_txns',
+        'amount_trends': 'amount_trend',
+    }
+    
+    def __getitem__(self, key):
+        """Dict-style access for callers still using the old dict keys"""
+        try:
+            return getattr(self, self._ALIASES.get(key, key))
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
 
 class LLMFraudExplainer:
     """
     Advanced fraud explanation system using Google Gemini
     """
     
-    def __init__(self, provider='gemini'):
+    # Shared by the blocking and async Gemini calls. The parser only reads the
+    # five report sections, so a tighter output budget cuts generation time.
+    GENERATION_CONFIG = {
+        'candidate_count': 1,
+        'temperature': 0.3,
+        'max_output_tokens': 800,
+    }
+    
+    # Report section headers, checked in this order against each LLM output line
+    _SECTION_HEADERS = (
+        ('EXECUTIVE SUMMARY', 'executive_summary'),
+        ('DETAILED ANALYSIS', 'detailed_analysis'),
+        ('BEHAVIORAL INSIGHTS', 'behavioral_insights'),
+        ('RISK FACTORS', 'risk_factors'),
+        ('RECOMMENDATION', 'recommendation'),
+    )
+    
+    # Context fields that change between otherwise identical requests
+    VOLATILE_CONTEXT_FIELDS = ('timestamp', 'last_seen')
+    
+    def __init__(self, provider='gemini', max_workers=8):
         """
         Initialize LLM explainer
         
         Args:
             provider: 'gemini' or 'mock' (for testing)
+            max_workers: Max concurrent Gemini requests in batch mode
         """
         self.provider = provider
+        self.max_workers = max_workers
+        
+        # Retries and dashboard refreshes re-send the same context within minutes
+        self._cache = TTLCache(maxsize=4096, ttl=600) if CACHETOOLS_AVAILABLE else None
+        self._cache_lock = threading.Lock()  # TTLCache isn't thread-safe and Flask serves on threads
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        self._instruction_cache = None
+        self._instruction_cache_refreshed = 0.0
+        # Guards the client / instruction cache swap; the explainer is shared across request threads
+        self._client_lock = threading.Lock()
         
         if provider == 'gemini' and GEMINI_AVAILABLE:
             api_key = os.environ.get('GEMINI_API_KEY')
@@ -39,17 +199,24 @@ class LLMFraudExplainer:
                     genai.configure(api_key=api_key)
                     # Try multiple model names in order of preference
                     model_options = [
-                        'gemini-2.0-flash-exp',           # Stable model
+                        'gemini-1.5-flash-latest',        # Low-latency serving model
+                        'gemini-1.5-flash',               # Pinned fallback
+                        'gemini-2.0-flash-exp',           # Experimental model
                     ]
                     
                     model_initialized = False
                     for model_name in model_options:
                         try:
-                            self.client = genai.GenerativeModel(model_name)
-                            # Test the model with a simple prompt
-                            test_response = self.client.generate_content("Hello", generation_config={'max_output_tokens': 10})
-                            print(f"✅ Gemini AI initialized successfully with model: {model_name}")
+                            if model_name in _MODEL_PROBE_CACHE:
+                                self.client = _MODEL_PROBE_CACHE[model_name]
+                            else:
+                                self.client = genai.GenerativeModel(model_name)
+                                # Test the model with a simple prompt (once per process)
+                                test_response = self.client.generate_content("Hello", generation_config={'max_output_tokens': 10})
+                                _MODEL_PROBE_CACHE[model_name] = self.client
+                                print(f"✅ Gemini AI initialized successfully with model: {model_name}")
                             model_initialized = True
+                            self._create_instruction_cache(model_name)
                             break
                         except Exception as model_error:
                             print(f"⚠️  Model {model_name} failed: {str(model_error)[:100]}")
@@ -73,7 +240,62 @@ class LLMFraudExplainer:
             print("ℹ️  Using mock LLM explanations")
     
     
-    def generate_fraud_explanation(self, current_transaction, customer_history, camara_data, ml_scores):
+    def _create_instruction_cache(self, model_name):
+        """
+        Upload the static report instructions as Gemini cached content
+        
+        Older SDKs have no caching module and Gemini rejects prefixes below
+        its minimum cacheable size; either way the instructions simply stay
+        inline in every prompt.
+        """
+        if not hasattr(genai, 'caching'):
+            return
+        
+        try:
+            cache = genai.caching.CachedContent.create(
+                model=f'models/{model_name}',
+                system_instruction=_STATIC_INSTRUCTIONS,
+                ttl=timedelta(seconds=INSTRUCTION_CACHE_TTL)
+            )
+            self._base_client = self.client
+            self.client = genai.GenerativeModel.from_cached_content(cached_content=cache)
+            self._instruction_cache = cache
+            self._instruction_cache_refreshed = time.monotonic()
+            print(f"✅ Report instructions cached: {cache.name}")
+        except Exception as e:
+            print(f"ℹ️  Instruction caching unavailable, sending inline: {str(e)[:100]}")
+    
+    
+    def _refresh_instruction_cache(self):
+        """Extend the cached instructions' TTL; drop back to inline on failure (call with _client_lock held)"""
+        if self._instruction_cache is None:
+            return
+        if time.monotonic() - self._instruction_cache_refreshed < INSTRUCTION_CACHE_TTL / 2:
+            return
+        
+        try:
+            self._instruction_cache.update(ttl=timedelta(seconds=INSTRUCTION_CACHE_TTL))
+            self._instruction_cache_refreshed = time.monotonic()
+        except Exception as e:
+            print(f"⚠️  Instruction cache refresh failed, sending inline: {str(e)[:100]}")
+            self._instruction_cache = None
+            self.client = self._base_client
+    
+    
+    def _gemini_client_and_prompt(self, context):
+        """
+        Client and prompt for one Gemini call, leaving out instructions already cached server-side
+        Both are read under the lock, so a concurrent refresh can't pair the
+        cached-content client with a prompt built for the other one.
+        """
+        with self._client_lock:
+            self._refresh_instruction_cache()
+            client = self.client
+            instructions_cached = self._instruction_cache is not None
+        return client, self._build_llm_prompt(context, include_instructions=not instructions_cached)
+    
+    
+    def generate_fraud_explanation(self, current_transaction, customer_history, camara_data, ml_scores, use_cache=True):
         """
         Generate comprehensive fraud explanation using LLM
         
@@ -82,6 +304,7 @@ class LLMFraudExplainer:
             customer_history: Past transaction history
             camara_data: CAMARA API results
             ml_scores: ML model scores and breakdown
+            use_cache: Set False to force a fresh Gemini call (the result still replaces the cached one)
             
         Returns:
             Dictionary with detailed explanation
@@ -92,19 +315,175 @@ class LLMFraudExplainer:
         
         # Generate explanation based on provider
         if self.provider == 'gemini':
-            return self._generate_gemini_explanation(context)
+            return self._generate_cached_gemini_explanation(context, use_cache=use_cache)
         else:
             return self._generate_mock_explanation(context)
     
     
+    def _generate_cached_gemini_explanation(self, context, use_cache=True):
+        """
+        Serve identical contexts from the TTL cache instead of calling Gemini again
+        
+        With use_cache=False the lookup is skipped, but a fresh Gemini result
+        still replaces the cached entry.
+        """
+        
+        if self._cache is None:
+            return self._generate_gemini_explanation(context)
+        
+        key = self._context_fingerprint(context)
+        if use_cache:
+            with self._cache_lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+            if cached is not None:
+                print(f"⚡ Explanation cache hit (hits: {self.cache_hits}, misses: {self.cache_misses})")
+                return cached
+        
+        # Gemini is called outside the lock so slow requests don't block cache hits
+        explanation = self._generate_gemini_explanation(context)
+        
+        # Mock fallbacks come from errors - let the next request retry Gemini
+        if explanation.get('generation_method') == 'gemini':
+            with self._cache_lock:
+                self._cache[key] = explanation
+        
+        return explanation
+    
+    
+    def stream_fraud_explanation(self, current_transaction, customer_history, camara_data, ml_scores):
+        """
+        Generate fraud explanation incrementally while Gemini is still writing
+        
+        Yields:
+            (section, value) tuples - each report section as soon as the next
+            header arrives, then 'anomalies', 'customer_profile' and
+            'generation_method' ('gemini+mock' if Gemini failed mid-stream and
+            the remaining sections came from the mock)
+        """
+        
+        context = self._build_context(current_transaction, customer_history, camara_data, ml_scores)
+        generation_method = 'mock'
+        emitted = set()
+        
+        if self.provider == 'gemini':
+            try:
+                chunks = self._generate_gemini_explanation_stream(context)
+                for section, value in self._iter_llm_sections(self._iter_stream_lines(chunks)):
+                    emitted.add(section)
+                    yield section, value
+                generation_method = 'gemini'
+            except Exception as e:
+                print(f"❌ Gemini API Error: {e}")
+                print("⚠️  Falling back to mock explanations")
+        
+        if generation_method == 'mock':
+            # Only fill in what Gemini didn't get to, so no section is sent twice
+            explanation = self._generate_mock_explanation(context)
+            for section in ('executive_summary', 'detailed_analysis', 'behavioral_insights', 'risk_factors', 'recommendation'):
+                if section not in emitted:
+                    yield section, explanation[section]
+            if emitted:
+                generation_method = 'gemini+mock'
+        
+        yield 'anomalies', context['detected_anomalies']
+        yield 'customer_profile', context['customer_profile']
+        yield 'generation_method', generation_method
+    
+    
+    def _context_fingerprint(self, context):
+        """Stable hash of the context, ignoring volatile fields"""
+        
+        def strip_volatile(value):
+            if isinstance(value, dict):
+                return {
+                    key: strip_volatile(item)
+                    for key, item in value.items()
+                    if key not in self.VOLATILE_CONTEXT_FIELDS
+                }
+            return value
+        
+        stable = strip_volatile(context)
+        if ORJSON_AVAILABLE:
+            payload = orjson.dumps(
+                stable,
+                default=str,
+                option=orjson.OPT_SORT_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+            )
+        else:
+            payload = json.dumps(stable, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
+    
+    def generate_fraud_explanations_batch(self, items):
+        """
+        Generate explanations for several transactions concurrently
+        
+        Args:
+            items: List of dicts with 'current_transaction', 'customer_history',
+                   'camara_data' and 'ml_scores' keys
+            
+        Returns:
+            List of explanation dictionaries, in the same order as items
+        """
+        
+        contexts = [
+            self._build_context(
+                item['current_transaction'],
+                item.get('customer_history', []),
+                item.get('camara_data', {}),
+                item.get('ml_scores', {})
+            )
+            for item in items
+        ]
+        
+        if self.provider != 'gemini':
+            return [self._generate_mock_explanation(context) for context in contexts]
+        
+        return asyncio.run(self._gather_gemini_explanations(contexts))
+    
+    
+    async def _gather_gemini_explanations(self, contexts):
+        """Run Gemini calls concurrently, at most max_workers in flight"""
+        
+        semaphore = asyncio.Semaphore(self.max_workers)
+        
+        async def explain(context):
+            async with semaphore:
+                return await self._generate_gemini_explanation_async(context)
+        
+        results = await asyncio.gather(*(explain(context) for context in contexts), return_exceptions=True)
+        
+        # A failed call only downgrades its own transaction to the mock explanation
+        explanations = []
+        for context, result in zip(contexts, results):
+            if isinstance(result, Exception):
+                print(f"❌ Gemini API Error: {result}")
+                print("⚠️  Falling back to mock explanation for this transaction")
+                explanations.append(self._generate_mock_explanation(context))
+            else:
+                explanations.append(result)
+        
+        return explanations
+    
+    
     def _build_context(self, current_txn, history, camara, scores):
         """Build comprehensive context for LLM"""
         
         # Analyze customer behavior patterns
         behavior_analysis = self._analyze_customer_behavior(history)
         
-        # Detect anomalies
-        anomalies = self._detect_anomalies(current_txn, history, camara)
+        # Detect anomalies (reuses the behavior stats computed above)
+        anomalies = self._detect_anomalies(current_txn, history, camara, behavior_analysis)
+        
+        # Resolve each CAMARA section once
+        sim_swap = camara.get('sim_swap') or {}
+        location = camara.get('location') or {}
+        roaming = camara.get('roaming') or {}
+        device_status = camara.get('device_status') or {}
         
         # Build structured context
         context = {
@@ -125,41 +504,41 @@ class LLMFraudExplainer:
             
             'camara_intelligence': {
                 'sim_swap': {
-                    'detected': camara.get('sim_swap', {}).get('swapped', False),
-                    'details': camara.get('sim_swap', {}).get('last_swap_date', 'N/A')
+                    'detected': sim_swap.get('swapped', False),
+                    'details': sim_swap.get('last_swap_date', 'N/A')
                 },
                 'location': {
-                    'verified': camara.get('location', {}).get('verified', True),
-                    'distance_km': camara.get('location', {}).get('distance_meters', 0) / 1000,
-                    'current_country': camara.get('location', {}).get('current_country', 'Unknown')
+                    'verified': location.get('verified', True),
+                    'distance_km': location.get('distance_meters', 0) / 1000,
+                    'current_country': location.get('current_country', 'Unknown')
                 },
                 'roaming': {
-                    'active': camara.get('roaming', {}).get('roaming', False),
-                    'network': camara.get('roaming', {}).get('current_network', 'N/A'),
-                    'country': camara.get('roaming', {}).get('roaming_country', 'N/A')
+                    'active': roaming.get('roaming', False),
+                    'network': roaming.get('current_network', 'N/A'),
+                    'country': roaming.get('roaming_country', 'N/A')
                 },
                 'device_status': {
-                    'status': camara.get('device_status', {}).get('connection_status', 'UNKNOWN'),
-                    'last_seen': camara.get('device_status', {}).get('last_seen', 'N/A')
+                    'status': device_status.get('connection_status', 'UNKNOWN'),
+                    'last_seen': device_status.get('last_seen', 'N/A')
                 }
             },
             
             'customer_profile': {
-                'total_transactions': behavior_analysis['total_transactions'],
-                'average_amount': behavior_analysis.get('avg_amount', 0),
-                'transaction_frequency': behavior_analysis['frequency'],
-                'typical_amount_range': behavior_analysis['typical_range'],
-                'high_risk_history': behavior_analysis['high_risk_count'],
-                'days_as_customer': behavior_analysis.get('customer_days', 0),
-                'velocity_pattern': behavior_analysis['velocity_pattern']
+                'total_transactions': behavior_analysis.total_transactions,
+                'average_amount': behavior_analysis.avg_amount,
+                'transaction_frequency': behavior_analysis.frequency,
+                'typical_amount_range': behavior_analysis.typical_range,
+                'high_risk_history': behavior_analysis.high_risk_count,
+                'days_as_customer': behavior_analysis.customer_days,
+                'velocity_pattern': behavior_analysis.velocity_pattern
             },
             
             'detected_anomalies': anomalies,
             
             'historical_context': {
-                'recent_transactions': behavior_analysis.get('recent_txns', []),
-                'location_changes': behavior_analysis['location_changes'],
-                'amount_trends': behavior_analysis['amount_trend']
+                'recent_transactions': behavior_analysis.recent_txns,
+                'location_changes': behavior_analysis.location_changes,
+                'amount_trends': behavior_analysis.amount_trend
             }
         }
         
@@ -170,33 +549,36 @@ class LLMFraudExplainer:
         """Analyze customer's historical behavior patterns"""
         
         if not history or len(history) == 0:
-            return {
-                'total_transactions': 0,
-                'avg_amount': 0.0,
-                'frequency': 'New Customer',
-                'typical_range': '$0 - $0',
-                'high_risk_count': 0,
-                'customer_days': 0,
-                'days_as_customer': 0,
-                'velocity_pattern': 'Unknown',
-                'recent_txns': [],
-                'recent_transactions': [],
-                'location_changes': 0,
-                'amount_trend': 'No history'
-            }
+            return BehaviorProfile(
+                total_transactions=0,
+                avg_amount=0.0,
+                frequency='New Customer',
+                typical_range='$0 - $0',
+                high_risk_count=0,
+                customer_days=0,
+                velocity_pattern='Unknown',
+                recent_txns=[],
+                location_changes=0,
+                amount_trend='No history'
+            )
         
-        # Calculate statistics
-        amounts = [txn.get('transaction_amount', 0) for txn in history]
-        avg_amount = sum(amounts) / len(amounts) if amounts else 0
+        # Calculate statistics (history order, one vector for every amount stat)
+        amounts = np.fromiter(
+            (txn.get('transaction_amount', 0) for txn in history),
+            dtype=np.float64, count=len(history)
+        )
+        avg_amount = float(amounts.mean())
         
-        # Sort by timestamp
-        sorted_history = sorted(history, key=lambda x: x.get('timestamp', ''), reverse=True)
+        # Only the 10 most recent transactions are inspected individually;
+        # nlargest matches sorted(reverse=True)[:10] including tie order
+        timestamps = [txn.get('timestamp', '') for txn in history]
+        latest_history = heapq.nlargest(10, history, key=lambda x: x.get('timestamp', ''))
         
         # Calculate time span
-        if len(sorted_history) > 1:
+        if len(history) > 1:
             try:
-                first_date = datetime.strptime(sorted_history[-1]['timestamp'], '%Y-%m-%d %H:%M:%S')
-                last_date = datetime.strptime(sorted_history[0]['timestamp'], '%Y-%m-%d %H:%M:%S')
+                first_date = datetime.strptime(min(timestamps), '%Y-%m-%d %H:%M:%S')
+                last_date = datetime.strptime(max(timestamps), '%Y-%m-%d %H:%M:%S')
                 days_span = (last_date - first_date).days or 1
                 frequency = f"{len(history)} txns / {days_span} days"
             except:
@@ -207,38 +589,34 @@ class LLMFraudExplainer:
             days_span = 0
         
         # Typical amount range
-        if amounts:
-            min_amt = min(amounts)
-            max_amt = max(amounts)
-            typical_range = f"${min_amt:.2f} - ${max_amt:.2f}"
-        else:
-            typical_range = "$0 - $0"
+        typical_range = f"${amounts.min():.2f} - ${amounts.max():.2f}"
         
         # High risk count
         high_risk_count = sum(1 for txn in history if txn.get('risk_level') == 'High Risk')
         
-        # Velocity pattern
-        recent_7d = [txn for txn in sorted_history if self._is_recent(txn.get('timestamp', ''), days=7)]
-        if len(recent_7d) > 10:
+        # Velocity pattern - parse every timestamp in one vectorized call
+        parsed = pd.to_datetime(pd.Series(timestamps, dtype=object), format='%Y-%m-%d %H:%M:%S', errors='coerce')
+        recent_7d = int(((datetime.now() - parsed).dt.days <= 7).sum())
+        if recent_7d > 10:
             velocity_pattern = "Very High Activity"
-        elif len(recent_7d) > 5:
+        elif recent_7d > 5:
             velocity_pattern = "High Activity"
-        elif len(recent_7d) > 2:
+        elif recent_7d > 2:
             velocity_pattern = "Moderate Activity"
         else:
             velocity_pattern = "Low Activity"
         
         # Location changes
         locations = set()
-        for txn in sorted_history[:10]:
+        for txn in latest_history:
             loc = f"{txn.get('country', 'Unknown')}"
             locations.add(loc)
         location_changes = len(locations) - 1 if len(locations) > 1 else 0
         
         # Amount trend
         if len(amounts) >= 3:
-            recent_avg = sum(amounts[:3]) / 3
-            older_avg = sum(amounts[-3:]) / 3
+            recent_avg = amounts[:3].mean()
+            older_avg = amounts[-3:].mean()
             if recent_avg > older_avg * 1.5:
                 amount_trend = "Increasing significantly"
             elif recent_avg > older_avg * 1.1:
@@ -252,102 +630,135 @@ class LLMFraudExplainer:
         
         # Recent transactions summary
         recent_txns = []
-        for txn in sorted_history[:5]:
+        for txn in latest_history[:5]:
             recent_txns.append({
                 'amount': txn.get('transaction_amount', 0),
                 'risk': txn.get('risk_level', 'Unknown'),
                 'time': txn.get('timestamp', 'Unknown')[:16]
             })
         
-        return {
-            'total_transactions': len(history),
-            'avg_amount': avg_amount,
-            'average_amount': avg_amount,
-            'frequency': frequency,
-            'typical_range': typical_range,
-            'high_risk_count': high_risk_count,
-            'customer_days': days_span,
-            'days_as_customer': days_span,
-            'velocity_pattern': velocity_pattern,
-            'recent_txns': recent_txns,
-            'recent_transactions': recent_txns,
-            'location_changes': location_changes,
-            'amount_trend': amount_trend,
-            'amount_trends': amount_trend
-        }
+        return BehaviorProfile(
+            total_transactions=len(history),
+            avg_amount=avg_amount,
+            frequency=frequency,
+            typical_range=typical_range,
+            high_risk_count=high_risk_count,
+            customer_days=days_span,
+            velocity_pattern=velocity_pattern,
+            recent_txns=recent_txns,
+            location_changes=location_changes,
+            amount_trend=amount_trend
+        )
     
     
-    def _detect_anomalies(self, current_txn, history, camara):
-        """Detect specific anomalies in current transaction"""
+    def _detect_anomalies(self, current_txn, history, camara, profile):
+        """Detect specific anomalies in current transaction (profile from _analyze_customer_behavior)"""
         
         anomalies = []
+        for check in self._ANOMALY_CHECKS:
+            anomaly = check(self, current_txn, history, camara, profile)
+            if anomaly:
+                anomalies.append(anomaly)
         
-        # Amount anomaly
-        if history and len(history) > 0:
-            amounts = [txn.get('transaction_amount', 0) for txn in history]
-            avg_amount = sum(amounts) / len(amounts)
-            current_amount = current_txn.get('amount', 0)
-            
-            if current_amount > avg_amount * 3:
-                anomalies.append({
-                    'type': 'AMOUNT_SPIKE',
-                    'severity': 'HIGH',
-                    'description': f'Transaction amount (${current_amount:.2f}) is {(current_amount/avg_amount):.1f}x higher than average (${avg_amount:.2f})'
-                })
+        return anomalies
+    
+    
+    def _check_amount(self, current_txn, history, camara, profile):
+        """Amount anomaly"""
+        if not history:
+            return None
+        
+        avg_amount = profile.avg_amount
+        current_amount = current_txn.get('amount', 0)
         
-        # SIM swap anomaly
+        if current_amount > avg_amount * 3:
+            return {
+                'type': 'AMOUNT_SPIKE',
+                'severity': 'HIGH',
+                'description': f'Transaction amount (${current_amount:.2f}) is {(current_amount/avg_amount):.1f}x higher than average (${avg_amount:.2f})'
+            }
+        return None
+    
+    
+    def _check_sim_swap(self, current_txn, history, camara, profile):
+        """SIM swap anomaly"""
         if camara.get('sim_swap', {}).get('swapped'):
-            anomalies.append({
+            return {
                 'type': 'SIM_SWAP',
                 'severity': 'CRITICAL',
                 'description': f"SIM card was recently changed ({camara['sim_swap'].get('last_swap_date', 'recently')}). This is a strong indicator of account takeover."
-            })
-        
-        # Location anomaly
+            }
+        return None
+    
+    
+    def _check_location(self, current_txn, history, camara, profile):
+        """Location anomaly"""
         if not camara.get('location', {}).get('verified', True):
             distance = camara.get('location', {}).get('distance_meters', 0) / 1000
-            anomalies.append({
+            return {
                 'type': 'LOCATION_MISMATCH',
                 'severity': 'HIGH',
                 'description': f'Device location is {distance:.1f} km away from registered address. Possible use of VPN or unauthorized access.'
-            })
-        
-        # Roaming anomaly
+            }
+        return None
+    
+    
+    def _check_roaming(self, current_txn, history, camara, profile):
+        """Roaming anomaly"""
         if camara.get('roaming', {}).get('roaming'):
             network = camara['roaming'].get('current_network', 'unknown network')
             country = camara['roaming'].get('roaming_country', 'unknown country')
-            anomalies.append({
+            return {
                 'type': 'ROAMING',
                 'severity': 'MEDIUM',
                 'description': f'Device is roaming on {network} in {country}. Verify if customer is traveling.'
-            })
-        
-        # Device offline anomaly
+            }
+        return None
+    
+    
+    def _check_device(self, current_txn, history, camara, profile):
+        """Device offline anomaly"""
         if camara.get('device_status', {}).get('connection_status') == 'NOT_CONNECTED':
-            anomalies.append({
+            return {
                 'type': 'DEVICE_OFFLINE',
                 'severity': 'MEDIUM',
                 'description': 'Device is currently offline. Transaction may be from compromised credentials on different device.'
-            })
-        
-        # Velocity anomaly
-        if history:
-            recent_1h = [txn for txn in history if self._is_recent(txn.get('timestamp', ''), hours=1)]
-            if len(recent_1h) >= 3:
-                anomalies.append({
-                    'type': 'HIGH_VELOCITY',
-                    'severity': 'HIGH',
-                    'description': f'Detected {len(recent_1h)} transactions within 1 hour. Possible automated attack or account compromise.'
-                })
+            }
+        return None
+    
+    
+    def _check_velocity(self, current_txn, history, camara, profile):
+        """Velocity anomaly"""
+        if not history:
+            return None
         
-        return anomalies
+        now = datetime.now()
+        recent_1h = sum(1 for txn in history if self._is_recent(txn.get('timestamp', ''), hours=1, now=now))
+        if recent_1h >= 3:
+            return {
+                'type': 'HIGH_VELOCITY',
+                'severity': 'HIGH',
+                'description': f'Detected {recent_1h} transactions within 1 hour. Possible automated attack or account compromise.'
+            }
+        return None
+    
+    
+    # Independent detectors, run in this order; each returns an anomaly dict or None
+    _ANOMALY_CHECKS = (
+        _check_amount,
+        _check_sim_swap,
+        _check_location,
+        _check_roaming,
+        _check_device,
+        _check_velocity,
+    )
     
     
-    def _is_recent(self, timestamp_str, days=None, hours=None):
-        """Check if timestamp is within recent timeframe"""
+    def _is_recent(self, timestamp_str, days=None, hours=None, now=None):
+        """Check if timestamp is within recent timeframe (pass now when checking many)"""
         try:
-            timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-            now = datetime.now()
+            timestamp = _parse_timestamp(timestamp_str)
+            now = now or datetime.now()
             
             if days:
                 return (now - timestamp).days <= days
@@ -363,17 +774,14 @@ class LLMFraudExplainer:
         """Generate explanation using Google Gemini"""
         
         try:
-            prompt = self._build_llm_prompt(context)
+            client, prompt = self._gemini_client_and_prompt(context)
             
             print("🔄 Calling Gemini API...")
             
             # Generate content with Gemini
-            response = self.client.generate_content(
+            response = client.generate_content(
                 prompt,
-                generation_config={
-                    'temperature': 0.3,
-                    'max_output_tokens': 2000,
-                }
+                generation_config=self.GENERATION_CONFIG
             )
             
             explanation = response.text
@@ -387,57 +795,83 @@ class LLMFraudExplainer:
             return self._generate_mock_explanation(context)
     
     
-    def _build_llm_prompt(self, context):
+    async def _generate_gemini_explanation_async(self, context):
+        """Generate explanation using Google Gemini without blocking (errors propagate)"""
+        
+        client, prompt = self._gemini_client_and_prompt(context)
+        
+        response = await client.generate_content_async(
+            prompt,
+            generation_config=self.GENERATION_CONFIG
+        )
+        
+        return self._parse_llm_response(response.text, context)
+    
+    
+    def _generate_gemini_explanation_stream(self, context):
+        """Stream explanation text from Google Gemini chunk by chunk"""
+        
+        client, prompt = self._gemini_client_and_prompt(context)
+        
+        print("🔄 Streaming from Gemini API...")
+        
+        response = client.generate_content(
+            prompt,
+            stream=True,
+            generation_config=self.GENERATION_CONFIG
+        )
+        
+        for chunk in response:
+            yield chunk.text
+    
+    
+    def _iter_stream_lines(self, chunks):
+        """Re-split streamed text chunks into complete lines"""
+        buffer = ''
+        for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split('\n')
+            yield from lines
+        yield buffer
+    
+    
+    def _build_llm_prompt(self, context, include_instructions=True):
         """Build comprehensive prompt for LLM"""
         
-        prompt = f"""Analyze this transaction and provide a detailed fraud investigation report.
-
-**CURRENT TRANSACTION:**
-- Phone: {context['current_transaction']['phone_number']}
-- Amount: ${context['current_transaction']['amount']:.2f}
-- Time: {context['current_transaction']['timestamp']}
-- Location: {context['current_transaction']['location']}
-
-**FRAUD DETECTION SCORES:**
-- Final Risk Score: {context['ml_scores']['final_risk_score']}/100
-- ML Model Score: {context['ml_scores']['model_probability']}/100
-- Decision: {context['ml_scores']['decision']}
-
-**NETWORK INTELLIGENCE (CAMARA APIs):**
-- SIM Swap: {'DETECTED - ' + context['camara_intelligence']['sim_swap']['details'] if context['camara_intelligence']['sim_swap']['detected'] else 'Clear'}
-- Location: {'MISMATCH - ' + str(context['camara_intelligence']['location']['distance_km']) + ' km from KYC' if not context['camara_intelligence']['location']['verified'] else 'Verified'}
-- Roaming: {'ACTIVE - ' + context['camara_intelligence']['roaming']['network'] + ' in ' + context['camara_intelligence']['roaming']['country'] if context['camara_intelligence']['roaming']['active'] else 'Not roaming'}
-- Device Status: {context['camara_intelligence']['device_status']['status']}
-
-**CUSTOMER PROFILE & HISTORY:**
-- Total Transactions: {context['customer_profile']['total_transactions']}
-- Average Amount: ${context['customer_profile']['average_amount']:.2f}
-- Typical Range: {context['customer_profile']['typical_amount_range']}
-- High Risk History: {context['customer_profile']['high_risk_history']} transactions
-- Customer Duration: {context['customer_profile']['days_as_customer']} days
-- Activity Level: {context['customer_profile']['velocity_pattern']}
-- Amount Trend: {context['customer_profile'].get('amount_trends', 'N/A')}
-
-**DETECTED ANOMALIES:**
-{self._format_anomalies_for_prompt(context['detected_anomalies'])}
-
-**RECENT TRANSACTION HISTORY:**
-{self._format_recent_txns_for_prompt(context['historical_context']['recent_transactions'])}
-
-Please provide a structured analysis with these sections:
-
- **EXECUTIVE SUMMARY** (2-3 sentences): High-level assessment
-
- **DETAILED ANALYSIS**: What makes this suspicious/legitimate? How does it compare to normal behavior?
-
- **BEHAVIORAL INSIGHTS**: Past patterns, changes, velocity analysis
-
- **RISK FACTORS** (list specific red flags with severity)
-
- **RECOMMENDATION**: APPROVE/BLOCK/ADDITIONAL VERIFICATION with specific next steps
-
-Write clearly for fraud investigators to act upon immediately."""
-
+        txn = context['current_transaction']
+        scores = context['ml_scores']
+        camara = context['camara_intelligence']
+        profile = context['customer_profile']
+        sim_swap = camara['sim_swap']
+        location = camara['location']
+        roaming = camara['roaming']
+        
+        prompt = _PROMPT_TEMPLATE.substitute(
+            phone_number=txn['phone_number'],
+            amount=f"{txn['amount']:.2f}",
+            timestamp=txn['timestamp'],
+            location=txn['location'],
+            final_risk_score=scores['final_risk_score'],
+            model_probability=scores['model_probability'],
+            decision=scores['decision'],
+            sim_swap='DETECTED - ' + sim_swap['details'] if sim_swap['detected'] else 'Clear',
+            location_check='MISMATCH - ' + str(location['distance_km']) + ' km from KYC' if not location['verified'] else 'Verified',
+            roaming='ACTIVE - ' + roaming['network'] + ' in ' + roaming['country'] if roaming['active'] else 'Not roaming',
+            device_status=camara['device_status']['status'],
+            total_transactions=profile['total_transactions'],
+            average_amount=f"{profile['average_amount']:.2f}",
+            typical_amount_range=profile['typical_amount_range'],
+            high_risk_history=profile['high_risk_history'],
+            days_as_customer=profile['days_as_customer'],
+            velocity_pattern=profile['velocity_pattern'],
+            amount_trend=profile.get('amount_trends', 'N/A'),
+            anomalies=self._format_anomalies_for_prompt(context['detected_anomalies']),
+            recent_transactions=self._format_recent_txns_for_prompt(context['historical_context']['recent_transactions'])
+        )
+        
+        if include_instructions:
+            prompt += '\n\n' + _STATIC_INSTRUCTIONS
+        
         return prompt
     
     
@@ -446,11 +880,7 @@ Write clearly for fraud investigators to act upon immediately."""
         if not anomalies:
             return "- No significant anomalies detected"
         
-        formatted = []
-        for anomaly in anomalies:
-            formatted.append(f"- [{anomaly['severity']}] {anomaly['description']}")
-        
-        return "\n".join(formatted)
+        return "\n".join(f"- [{anomaly['severity']}] {anomaly['description']}" for anomaly in anomalies)
     
     
     def _format_recent_txns_for_prompt(self, recent_txns):
@@ -458,11 +888,10 @@ Write clearly for fraud investigators to act upon immediately."""
         if not recent_txns:
             return "- No transaction history available (new customer)"
         
-        formatted = []
-        for i, txn in enumerate(recent_txns, 1):
-            formatted.append(f"{i}. ${txn['amount']:.2f} at {txn['time']} - Risk: {txn['risk']}")
-        
-        return "\n".join(formatted)
+        return "\n".join(
+            f"{i}. ${txn['amount']:.2f} at {txn['time']} - Risk: {txn['risk']}"
+            for i, txn in enumerate(recent_txns, 1)
+        )
     
     
     def _parse_llm_response(self, llm_text, context):
@@ -479,8 +908,21 @@ Write clearly for fraud investigators to act upon immediately."""
             'generation_method': 'gemini'
         }
         
-        # Simple parsing logic
-        lines = llm_text.split('\n')
+        sections.update(self._iter_llm_sections(llm_text.split('\n')))
+        
+        return sections
+    
+    
+    def _iter_llm_sections(self, lines):
+        """
+        Section-by-section parser for LLM output
+        
+        Works on any iterable of lines, so streamed responses can emit each
+        section as soon as the following header shows up.
+        
+        Yields:
+            (section, value) tuples in the order they appear
+        """
         current_section = None
         current_content = []
         
@@ -488,33 +930,11 @@ Write clearly for fraud investigators to act upon immediately."""
             line = line.strip()
             
             # Detect section headers
-            if 'EXECUTIVE SUMMARY' in line.upper():
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content)
-                current_section = 'executive_summary'
-                current_content = []
-            elif 'DETAILED ANALYSIS' in line.upper():
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content)
-                current_section = 'detailed_analysis'
-                current_content = []
-            elif 'BEHAVIORAL INSIGHTS' in line.upper():
+            header = self._match_section_header(line)
+            if header:
                 if current_section:
-                    sections[current_section] = '\n'.join(current_content)
-                current_section = 'behavioral_insights'
-                current_content = []
-            elif 'RISK FACTORS' in line.upper():
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content)
-                current_section = 'risk_factors'
-                current_content = []
-            elif 'RECOMMENDATION' in line.upper():
-                if current_section:
-                    if current_section == 'risk_factors':
-                        sections[current_section] = self._parse_risk_factors(current_content)
-                    else:
-                        sections[current_section] = '\n'.join(current_content)
-                current_section = 'recommendation'
+                    yield current_section, self._finish_section(current_section, current_content)
+                current_section = header
                 current_content = []
             elif line and current_section:
                 if not line.startswith('#') and not line.startswith('**'):
@@ -522,14 +942,24 @@ Write clearly for fraud investigators to act upon immediately."""
         
         # Handle last section
         if current_section:
-            if current_section == 'risk_factors':
-                sections[current_section] = self._parse_risk_factors(current_content)
-            elif current_section == 'recommendation':
-                sections[current_section] = self._parse_recommendation(current_content)
-            else:
-                sections[current_section] = '\n'.join(current_content)
-        
-        return sections
+            yield current_section, self._finish_section(current_section, current_content)
+    
+    
+    def _match_section_header(self, line):
+        """Return the section key if line is a section header, else None"""
+        upper = line.upper()
+        for header, section in self._SECTION_HEADERS:
+            if header in upper:
+                return section
+        return None
+    
+    
+    def _finish_section(self, section, content):
+        """Convert collected section lines into the section's value"""
+        parser = self._SECTION_PARSERS.get(section)
+        if parser:
+            return parser(self, content)
+        return '\n'.join(content)
     
     
     def _parse_risk_factors(self, content):
@@ -547,11 +977,11 @@ Write clearly for fraud investigators to act upon immediately."""
     
     def _parse_recommendation(self, content):
         """Parse recommendation from LLM output"""
-        text = ' '.join(content)
+        text = ' '.join(content).upper()
         
-        if 'BLOCK' in text.upper() or 'REJECT' in text.upper():
+        if 'BLOCK' in text or 'REJECT' in text:
             action = 'BLOCK TRANSACTION'
-        elif 'VERIFY' in text.upper() or 'STEP' in text.upper():
+        elif 'VERIFY' in text or 'STEP' in text:
             action = 'REQUIRE ADDITIONAL VERIFICATION'
         else:
             action = 'APPROVE TRANSACTION'
@@ -563,6 +993,13 @@ Write clearly for fraud investigators to act upon immediately."""
         }
     
     
+    # Sections with structured values; the rest are joined as plain text
+    _SECTION_PARSERS = {
+        'risk_factors': _parse_risk_factors,
+        'recommendation': _parse_recommendation,
+    }
+    
+    
     def _generate_mock_explanation(self, context):
         """Generate detailed mock explanation (fallback)"""
         
@@ -664,4 +1101,29 @@ Write clearly for fraud investigators to act upon immediately."""
                 'action': 'APPROVE TRANSACTION',
                 'next_steps': ['Process normally', 'Continue monitoring'],
                 'urgency': 'STANDARD PROCESSING'
-            }
\ No newline at end of file
+            }
+
+
+SUPPORTED_PROVIDERS = ('gemini', 'mock')
+
+_explainers = {}
+_explainers_lock = threading.Lock()
+
+
+def get_explainer(provider='gemini'):
+    """
+    Shared explainer per provider, so model setup runs once per process
+    
+    An explainer that fell back to mock (no API key, failed model probe) is
+    not kept, so the next call tries the requested provider again.
+    """
+    if provider not in SUPPORTED_PROVIDERS:
+        raise ValueError(f"Unsupported LLM provider: {provider!r} (expected one of {', '.join(SUPPORTED_PROVIDERS)})")
+    
+    with _explainers_lock:
+        explainer = _explainers.get(provider)
+        if explainer is None:
+            explainer = LLMFraudExplainer(provider=provider)
+            if explainer.provider == provider:
+                _explainers[provider] = explainer
+        return explainer
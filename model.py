@@ -1,25 +1,60 @@
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OrdinalEncoder
 from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
-import pickle
+import os
+import joblib
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 warnings.filterwarnings('ignore')
 
+# Train on the GPU when this XGBoost build has CUDA support
+XGB_DEVICE = 'cuda' if xgb.build_info().get('USE_CUDA') else 'cpu'
+
+# Optional: cupy lets predict_batch feed a CUDA-trained booster device arrays
+try:
+    import cupy
+    CUPY_AVAILABLE = True
+except ImportError:
+    CUPY_AVAILABLE = False
+
 # ============================================================================
 # DATA LOADING AND PREPROCESSING
 # ============================================================================
 
+# Identifier columns never used as features
+ID_COLUMNS = frozenset(['country_code', 'phone_number', 'full_phone', 'customer_id'])
+
 def load_and_prepare_data(df):
     """Load data and separate features from target"""
-    id_columns = ['country_code', 'phone_number', 'full_phone', 'customer_id']
     df.columns = df.columns.str.lower()
-    X = df.drop(columns=['fraud_label'] + [col for col in id_columns if col in df.columns])
+    id_cols_present = ID_COLUMNS.intersection(df.columns)
+    X = df.drop(columns=['fraud_label', *id_cols_present])
     y = df['fraud_label']
     return X, y
 
+def stratified_split(X, y, val_size=0.16, test_size=0.2, random_state=42):
+    """Stratified train/val/test split in one pass (default 64% / 16% / 20%)"""
+    rng = np.random.default_rng(random_state)
+    labels = np.asarray(y)
+    
+    train_parts, val_parts, test_parts = [], [], []
+    for label in np.unique(labels):
+        class_idx = rng.permutation(np.flatnonzero(labels == label))
+        n_test = int(round(len(class_idx) * test_size))
+        n_val = int(round(len(class_idx) * val_size))
+        test_parts.append(class_idx[:n_test])
+        val_parts.append(class_idx[n_test:n_test + n_val])
+        train_parts.append(class_idx[n_test + n_val:])
+    
+    # Shuffle across classes so rows are not grouped by label
+    train_idx, val_idx, test_idx = (rng.permutation(np.concatenate(parts)) for parts in (train_parts, val_parts, test_parts))
+    return (
+        X.iloc[train_idx], X.iloc[val_idx], X.iloc[test_idx],
+        y.iloc[train_idx], y.iloc[val_idx], y.iloc[test_idx]
+    )
+
 # ============================================================================
 # COLUMN DETECTION AND ENCODING
 # ============================================================================
@@ -29,10 +64,16 @@ def detect_column_types(X):
     categorical_cols = []
     numerical_cols = []
     
-    for col in X.columns:
-        if X[col].dtype == 'object' or X[col].dtype.name == 'category':
+    # Only integer columns need a pass over the data; count them in one nunique() call
+    dtypes = X.dtypes
+    int_cols = [col for col, dtype in dtypes.items() if dtype in ['int64', 'int32']]
+    nuniques = X[int_cols].nunique()
+    low_cardinality = set(nuniques.index[nuniques < 20])
+    
+    for col, dtype in dtypes.items():
+        if dtype == 'object' or dtype.name == 'category':
             categorical_cols.append(col)
-        elif X[col].nunique() < 20 and X[col].dtype in ['int64', 'int32']:
+        elif col in low_cardinality:
             categorical_cols.append(col)
         else:
             numerical_cols.append(col)
@@ -42,29 +83,81 @@ def detect_column_types(X):
 def encode_features(X_train, X_test, categorical_cols):
     """Encode categorical features"""
     if not categorical_cols:
-        return X_train.copy(), X_test.copy(), None
+        # Nothing to encode and nothing downstream mutates the frames
+        return X_train, X_test, None
     
+    # Unknown/missing -> NaN: XGBoost categorical splits need non-negative codes
+    # and send NaN down each split's learned default branch
     encoder = OrdinalEncoder(
         handle_unknown='use_encoded_value',
-        unknown_value=-1,
-        encoded_missing_value=-1
+        unknown_value=np.nan,
+        encoded_missing_value=np.nan
     )
     
-    X_train_encoded = X_train.copy()
-    X_test_encoded = X_test.copy()
-    
-    X_train_encoded[categorical_cols] = encoder.fit_transform(X_train[categorical_cols])
-    X_test_encoded[categorical_cols] = encoder.transform(X_test[categorical_cols])
+    encoder.fit(X_train[categorical_cols])
+    X_train_encoded = with_encoded_columns(X_train, ordinal_encode(X_train, encoder, categorical_cols), categorical_cols)
+    X_test_encoded = with_encoded_columns(X_test, ordinal_encode(X_test, encoder, categorical_cols), categorical_cols)
     
     return X_train_encoded, X_test_encoded, encoder
 
+def with_encoded_columns(X, encoded, categorical_cols):
+    """Return X with categorical_cols swapped for their codes (one concat, no column assignment)"""
+    codes = pd.DataFrame(encoded, index=X.index, columns=categorical_cols)
+    return pd.concat([X.drop(columns=categorical_cols), codes], axis=1)[X.columns]
+
+# Below this many encoded cells the thread hand-off costs more than the lookups
+PARALLEL_ENCODE_THRESHOLD = 1000000
+
+def ordinal_encode(X, encoder, categorical_cols):
+    """
+    Apply a fitted OrdinalEncoder through pandas hash lookups (unknown/missing -> NaN)
+    Columns with a CategoricalDtype are recoded from .cat.codes without hashing every row
+    """
+    # Column-major so each column's codes are written contiguously
+    encoded = np.empty((len(X), len(categorical_cols)), dtype=np.float64, order='F')
+    
+    def encode_column(i):
+        categories = encoder.categories_[i]
+        # NaN (not None - that is a real category) sorts last in categories_;
+        # leaving it out of the lookup sends missing values to NaN too
+        if len(categories) and categories[-1] is not None and pd.isna(categories[-1]):
+            categories = categories[:-1]
+        column = X[categorical_cols[i]]
+        # Categorical columns fold None into missing, so they only take the
+        # fast path when None is not a category of its own
+        if isinstance(column.dtype, pd.CategoricalDtype) and not any(c is None for c in categories):
+            # Look up the few categories, then remap the integer codes
+            # (-1 = missing indexes the trailing -1)
+            category_codes = np.append(pd.Index(categories).get_indexer(column.cat.categories), -1)
+            codes = category_codes[column.cat.codes.to_numpy()]
+        else:
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                column = column.astype(object)
+            codes = pd.Index(categories).get_indexer(column)
+        encoded[:, i] = np.where(codes >= 0, codes, np.nan)
+    
+    if len(categorical_cols) > 1 and encoded.size >= PARALLEL_ENCODE_THRESHOLD:
+        with ThreadPoolExecutor(max_workers=min(len(categorical_cols), os.cpu_count() or 1)) as executor:
+            list(executor.map(encode_column, range(len(categorical_cols))))
+    else:
+        for i in range(len(categorical_cols)):
+            encode_column(i)
+    return encoded
+
 # ============================================================================
 # MODEL TRAINING
 # ============================================================================
 
-def train_xgboost_model(X_train, y_train, X_val, y_val):
-    """Train XGBoost model"""
-    scale_pos_weight = (y_train == 0).sum() / (y_train == 1).sum()
+# 255 bins keep every histogram bin index inside a uint8
+MAX_BIN = 255
+
+def train_xgboost_model(X_train, y_train, X_val, y_val, categorical_cols=(), device=XGB_DEVICE):
+    """Train XGBoost model; also returns the training QuantileDMatrix so eval sets can reuse its bins"""
+    feature_names = X_train.columns.tolist()
+    # Encoded categorical columns get native categorical splits instead of ordinal thresholds
+    feature_types = ['c' if col in categorical_cols else 'q' for col in feature_names]
+    class_counts = np.bincount(np.asarray(y_train, dtype=np.int64), minlength=2)
+    scale_pos_weight = class_counts[0] / class_counts[1]
     
     params = {
         'objective': 'binary:logistic',
@@ -77,11 +170,14 @@ def train_xgboost_model(X_train, y_train, X_val, y_val):
         'scale_pos_weight': scale_pos_weight,
         'random_state': 42,
         'tree_method': 'hist',
-        'device': 'cpu'
+        'max_bin': MAX_BIN,
+        'max_cat_threshold': 32,
+        'device': device
     }
     
-    dtrain = xgb.DMatrix(X_train, label=y_train, enable_categorical=False, feature_names=X_train.columns.tolist())
-    dval = xgb.DMatrix(X_val, label=y_val, enable_categorical=False, feature_names=X_val.columns.tolist())
+    # QuantileDMatrix bins once; the validation set reuses the training bin edges
+    dtrain = xgb.QuantileDMatrix(X_train, label=y_train, enable_categorical=True, feature_names=feature_names, feature_types=feature_types, max_bin=MAX_BIN)
+    dval = xgb.QuantileDMatrix(X_val, label=y_val, ref=dtrain, enable_categorical=True, feature_names=feature_names, feature_types=feature_types, max_bin=MAX_BIN)
     
     evals = [(dtrain, 'train'), (dval, 'validation')]
     
@@ -95,14 +191,32 @@ def train_xgboost_model(X_train, y_train, X_val, y_val):
         verbose_eval=50,
     )
     
-    return model
+    return model, dtrain
 
 # ============================================================================
 # PREDICTION
 # ============================================================================
 
-def predict_new_data(new_df, model, encoder, categorical_cols, feature_columns):
-    """Make predictions on new data"""
+RISK_BINS = np.array([0.3, 0.7])
+RISK_LABELS = ['LOW', 'MEDIUM', 'HIGH']
+
+def risk_levels(fraud_probabilities):
+    """Bucket probabilities into LOW (<= 0.3) / MEDIUM (<= 0.7) / HIGH"""
+    codes = np.searchsorted(RISK_BINS, fraud_probabilities)
+    return pd.Categorical.from_codes(codes, categories=RISK_LABELS)
+
+def predict_batch(model, X_block, use_gpu=False):
+    """
+    Score an already-encoded feature block (rows in feature_columns order)
+    Goes straight to Booster.inplace_predict - no DataFrame or DMatrix build
+    """
+    X_block = np.ascontiguousarray(X_block, dtype=np.float32)
+    if use_gpu and CUPY_AVAILABLE:
+        return cupy.asnumpy(model.inplace_predict(cupy.asarray(X_block), predict_type='value'))
+    return model.inplace_predict(X_block, predict_type='value')
+
+def predict_new_data(new_df, model, encoder, categorical_cols, feature_columns, use_gpu=False):
+    """Make predictions on new data (use_gpu scores through cupy on a CUDA-trained model)"""
     print("="*70)
     print("PREDICTING ON NEW DATA")
     print("="*70)
@@ -111,31 +225,30 @@ def predict_new_data(new_df, model, encoder, categorical_cols, feature_columns):
     
     X_new = new_df.drop(columns=[col for col in id_columns if col in new_df.columns], errors='ignore')
     
-    missing_cols = set(feature_columns) - set(X_new.columns)
+    missing_cols = set(feature_columns).difference(X_new.columns)
     if missing_cols:
         print(f"Warning: Missing columns: {missing_cols}")
-        for col in missing_cols:
-            X_new[col] = 0
     
-    X_new = X_new[feature_columns]
+    # One reindex both orders the columns and adds any missing ones as 0
+    X_new = X_new.reindex(columns=feature_columns, fill_value=0)
     
-    X_new_encoded = X_new.copy()
+    # Fill the float32 matrix the booster reads directly - numeric columns
+    # are copied in, categorical columns encoded in place (no frame copy)
+    X_new_array = np.empty((len(X_new), len(feature_columns)), dtype=np.float32)
+    is_categorical = X_new.columns.isin(categorical_cols if encoder else [])
+    X_new_array[:, ~is_categorical] = X_new.loc[:, ~is_categorical].to_numpy(dtype=np.float32)
     if encoder and categorical_cols:
         print(f"Encoding {len(categorical_cols)} categorical features...")
-        X_new_encoded[categorical_cols] = encoder.transform(X_new[categorical_cols])
-    
-    dnew = xgb.DMatrix(X_new_encoded, enable_categorical=False, feature_names=feature_columns)
+        X_new_array[:, X_new.columns.get_indexer(categorical_cols)] = ordinal_encode(X_new, encoder, categorical_cols)
     
     print("Generating predictions...")
-    fraud_probabilities = model.predict(dnew)
+    fraud_probabilities = predict_batch(model, X_new_array, use_gpu)
     fraud_predictions = (fraud_probabilities > 0.5).astype(int)
     
     results_df = new_df.copy()
     results_df['fraud_probability'] = fraud_probabilities
     results_df['fraud_prediction'] = fraud_predictions
-    results_df['risk_level'] = results_df['fraud_probability'].apply(
-        lambda x: 'HIGH' if x > 0.7 else ('MEDIUM' if x > 0.3 else 'LOW')
-    )
+    results_df['risk_level'] = risk_levels(fraud_probabilities)
     
     print(f"\nTotal records: {len(results_df)}")
     print(f"Predicted frauds: {fraud_predictions.sum()} ({fraud_predictions.mean():.2%})")
@@ -144,12 +257,39 @@ def predict_new_data(new_df, model, encoder, categorical_cols, feature_columns):
     
     return results_df
 
+# ============================================================================
+# MODEL PERSISTENCE
+# ============================================================================
+
+MODEL_PATH = 'fraud_model.ubj'
+ARTIFACTS_PATH = 'artifacts.joblib'
+
+def save_artifacts(pipeline_artifacts, model_path=MODEL_PATH, artifacts_path=ARTIFACTS_PATH):
+    """Save the booster as UBJSON and the encoder + column lists with joblib"""
+    pipeline_artifacts['model'].save_model(model_path)
+    joblib.dump({
+        'encoder': pipeline_artifacts['encoder'],
+        'categorical_cols': pipeline_artifacts['categorical_cols'],
+        'feature_columns': pipeline_artifacts['feature_columns']
+    }, artifacts_path, compress=3)
+    print(f"✓ Model saved to: {model_path}")
+    print(f"✓ Encoder saved to: {artifacts_path}")
+
+def load_artifacts(model_path=MODEL_PATH, artifacts_path=ARTIFACTS_PATH):
+    """Load what save_artifacts wrote; returns the same dict as main_pipeline"""
+    model = xgb.Booster()
+    model.load_model(model_path)
+    artifacts = joblib.load(artifacts_path)
+    artifacts['model'] = model
+    return artifacts
+
 # ============================================================================
 # MAIN PIPELINE
 # ============================================================================
 
-def main_pipeline(df):
-    """Complete training pipeline"""
+def main_pipeline(df, use_gpu=XGB_DEVICE == 'cuda'):
+    """Complete training pipeline (use_gpu trains with device='cuda'; pass the result to save_artifacts to persist it)"""
+    device = 'cuda' if use_gpu else 'cpu'
     print("="*70)
     print("XGBOOST FRAUD DETECTION PIPELINE")
     print("="*70)
@@ -157,6 +297,7 @@ def main_pipeline(df):
     # Prepare data
     print("\n1. Loading and preparing data...")
     X, y = load_and_prepare_data(df)
+    feature_columns = X.columns.tolist()
     print(f"   Dataset shape: {X.shape}")
     print(f"   Fraud rate: {y.mean():.2%}")
     
@@ -168,27 +309,27 @@ def main_pipeline(df):
     
     # Train-test split
     print("\n3. Splitting data...")
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-    X_train_split, X_val, y_train_split, y_val = train_test_split(
-        X_train, y_train, test_size=0.2, random_state=42, stratify=y_train
-    )
+    X_train_split, X_val, X_test, y_train_split, y_val, y_test = stratified_split(X, y)
     
     # Encode features
     print("\n4. Encoding categorical features...")
     X_train_enc, X_val_enc, encoder = encode_features(X_train_split, X_val, categorical_cols)
-    X_test_enc, _, _ = encode_features(X_test, X_test, categorical_cols)
+    X_test_enc = X_test
     if encoder:
-        X_test_enc[categorical_cols] = encoder.transform(X_test[categorical_cols])
+        X_test_enc = with_encoded_columns(X_test, ordinal_encode(X_test, encoder, categorical_cols), categorical_cols)
+    # XGBoost works in float32 internally; casting up front halves the bytes it reads
+    X_train_enc, X_val_enc, X_test_enc = (
+        frame.astype(np.float32, copy=False) for frame in (X_train_enc, X_val_enc, X_test_enc)
+    )
     
     # Train model
     print("\n5. Training XGBoost model...")
-    model = train_xgboost_model(X_train_enc, y_train_split, X_val_enc, y_val)
+    model, dtrain = train_xgboost_model(X_train_enc, y_train_split, X_val_enc, y_val, categorical_cols, device)
     
     # Evaluate model
     print("\n6. Evaluating model on test set...")
-    dtest = xgb.DMatrix(X_test_enc, enable_categorical=False, feature_names=X_test_enc.columns.tolist())
+    # Test set is binned with the training quantiles instead of re-sketching
+    dtest = xgb.QuantileDMatrix(X_test_enc, ref=dtrain, enable_categorical=True, feature_names=feature_columns, feature_types=model.feature_types, max_bin=MAX_BIN)
     y_pred_proba = model.predict(dtest)
     y_pred = (y_pred_proba > 0.5).astype(int)
     
@@ -202,12 +343,14 @@ def main_pipeline(df):
     print("PIPELINE COMPLETE!")
     print("="*70)
     
-    return {
+    pipeline_artifacts = {
         'model': model,
         'encoder': encoder,
         'categorical_cols': categorical_cols,
-        'feature_columns': X.columns.tolist()
+        'feature_columns': feature_columns
     }
+    
+    return pipeline_artifacts
 
 # ============================================================================
 # RUN TRAINING
@@ -225,7 +368,11 @@ if __name__ == "__main__":
      'kyc_country', 'kyc_city', 'geo_restriction_level',
      'restricted_geo_location']
     """
-    
-    print("✓ Model saved to: fraud_model.json")
-    print("✓ Encoder saved to: encoder.pkl")
-    
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    df = pd.read_csv(os.path.join(base_dir, 'Data', 'banking_cust_dataset.csv'))
+    pipeline_artifacts = main_pipeline(df)
+    save_artifacts(
+        pipeline_artifacts,
+        model_path=os.path.join(base_dir, MODEL_PATH),
+        artifacts_path=os.path.join(base_dir, ARTIFACTS_PATH)
+    )
@@ -1,12 +1,22 @@
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OrdinalEncoder
 from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
 import shap
 import matplotlib.pyplot as plt
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 import warnings
+# Helpers shared with the lightweight training script live in model.py
+from model import (
+    XGB_DEVICE, MAX_BIN, RISK_BINS, RISK_LABELS, MODEL_PATH, ARTIFACTS_PATH,
+    stratified_split, detect_column_types, with_encoded_columns, ordinal_encode,
+    risk_levels, predict_batch, save_artifacts, load_artifacts
+)
 warnings.filterwarnings('ignore')
 
 # ============================================================================
@@ -30,47 +40,30 @@ def load_and_prepare_data(df):
 # 2. INTELLIGENT COLUMN DETECTION AND ENCODING
 # ============================================================================
 
-def detect_column_types(X):
-    """
-    Automatically detect categorical vs numerical columns
-    """
-    categorical_cols = []
-    numerical_cols = []
-    
-    for col in X.columns:
-        # Check if column is object/string type or has few unique values
-        if X[col].dtype == 'object' or X[col].dtype.name == 'category':
-            categorical_cols.append(col)
-        elif X[col].nunique() < 20 and X[col].dtype in ['int64', 'int32']:
-            # Likely categorical (e.g., flags, small integer codes)
-            categorical_cols.append(col)
-        else:
-            numerical_cols.append(col)
-    
-    return categorical_cols, numerical_cols
-
 def encode_features(X_train, X_test, categorical_cols):
     """
     Encode categorical features using OrdinalEncoder
     Handles unknown categories gracefully
     """
     if not categorical_cols:
-        return X_train.copy(), X_test.copy(), None
+        # Nothing to encode and nothing downstream mutates the frames
+        return X_train, X_test, None
     
     # Initialize encoder with unknown value handling
+    # Unknown/missing -> NaN: XGBoost categorical splits need non-negative codes
+    # and send NaN down each split's learned default branch
     encoder = OrdinalEncoder(
         handle_unknown='use_encoded_value',
-        unknown_value=-1,
-        encoded_missing_value=-1
+        unknown_value=np.nan,
+        encoded_missing_value=np.nan
     )
     
     # Fit on training data
-    X_train_encoded = X_train.copy()
-    X_test_encoded = X_test.copy()
+    encoder.fit(X_train[categorical_cols])
     
     # Encode categorical columns
-    X_train_encoded[categorical_cols] = encoder.fit_transform(X_train[categorical_cols])
-    X_test_encoded[categorical_cols] = encoder.transform(X_test[categorical_cols])
+    X_train_encoded = with_encoded_columns(X_train, ordinal_encode(X_train, encoder, categorical_cols), categorical_cols)
+    X_test_encoded = with_encoded_columns(X_test, ordinal_encode(X_test, encoder, categorical_cols), categorical_cols)
     
     return X_train_encoded, X_test_encoded, encoder
 
@@ -78,12 +71,18 @@ def encode_features(X_train, X_test, categorical_cols):
 # 3. MODEL TRAINING WITH XGBOOST 3.1.1
 # ============================================================================
 
-def train_xgboost_model(X_train, y_train, X_val, y_val):
+def train_xgboost_model(X_train, y_train, X_val, y_val, categorical_cols=(), device=XGB_DEVICE):
     """
     Train XGBoost model with optimized hyperparameters for fraud detection
+    Returns (model, dtrain) - pass dtrain as ref= when building further eval matrices
     """
+    feature_names = X_train.columns.tolist()
+    # Encoded categorical columns get native categorical splits instead of ordinal thresholds
+    feature_types = ['c' if col in categorical_cols else 'q' for col in feature_names]
+    
     # Calculate scale_pos_weight for imbalanced data
-    scale_pos_weight = (y_train == 0).sum() / (y_train == 1).sum()
+    class_counts = np.bincount(np.asarray(y_train, dtype=np.int64), minlength=2)
+    scale_pos_weight = class_counts[0] / class_counts[1]
     
     # XGBoost parameters optimized for fraud detection
     params = {
@@ -97,12 +96,14 @@ def train_xgboost_model(X_train, y_train, X_val, y_val):
         'scale_pos_weight': scale_pos_weight,
         'random_state': 42,
         'tree_method': 'hist',  # Fast histogram-based algorithm
-        'device': 'cpu'  # Compatible with XGBoost 3.1.1
+        'max_bin': MAX_BIN,
+        'max_cat_threshold': 32,  # cap categories per split on high-cardinality columns
+        'device': device  # 'cuda' for the GPU histogram trainer
     }
     
-    # Create DMatrix for XGBoost with feature names
-    dtrain = xgb.DMatrix(X_train, label=y_train, enable_categorical=False, feature_names=X_train.columns.tolist())
-    dval = xgb.DMatrix(X_val, label=y_val, enable_categorical=False, feature_names=X_val.columns.tolist())
+    # Create QuantileDMatrix for XGBoost with feature names (validation reuses the training bins)
+    dtrain = xgb.QuantileDMatrix(X_train, label=y_train, enable_categorical=True, feature_names=feature_names, feature_types=feature_types, max_bin=MAX_BIN)
+    dval = xgb.QuantileDMatrix(X_val, label=y_val, ref=dtrain, enable_categorical=True, feature_names=feature_names, feature_types=feature_types, max_bin=MAX_BIN)
     
     # Training with early stopping
     evals = [(dtrain, 'train'), (dval, 'validation')]
@@ -117,7 +118,7 @@ def train_xgboost_model(X_train, y_train, X_val, y_val):
         verbose_eval=50,
     )
     
-    return model
+    return model, dtrain
 
 # ============================================================================
 # 4. FEATURE IMPORTANCE ANALYSIS
@@ -158,6 +159,28 @@ def plot_feature_importance(model, feature_names, top_n=15):
 # 5. SHAP EXPLAINABILITY
 # ============================================================================
 
+class BoosterShapExplainer:
+    """
+    SHAP values computed by XGBoost itself (pred_contribs=True)
+    Exact TreeSHAP in the booster's C++ code (GPUTreeShap on CUDA builds),
+    callable like a shap explainer: explainer(X) -> shap.Explanation
+    """
+    
+    def __init__(self, model, feature_names):
+        self.model = model
+        self.feature_names = feature_names
+    
+    def __call__(self, X):
+        dmatrix = xgb.DMatrix(X, enable_categorical=True, feature_names=self.feature_names, feature_types=self.model.feature_types)
+        contribs = self.model.predict(dmatrix, pred_contribs=True)
+        # Last column is the bias term (the expected value for every row)
+        return shap.Explanation(
+            values=contribs[:, :-1],
+            base_values=contribs[:, -1],
+            data=np.asarray(X),
+            feature_names=self.feature_names
+        )
+
 def explain_with_shap(model, X_sample, feature_names, sample_size=100):
     """
     Generate SHAP explanations for model predictions
@@ -178,11 +201,8 @@ def explain_with_shap(model, X_sample, feature_names, sample_size=100):
         shap_values_array = shap_values.values
     except (ValueError, AttributeError) as e:
         print(f"Note: Using alternative SHAP method due to XGBoost 3.x compatibility")
-        # Fallback: Use model predictions to estimate SHAP values
-        explainer = shap.Explainer(
-            lambda x: model.predict(xgb.DMatrix(x, enable_categorical=False, feature_names=feature_names)),
-            X_shap
-        )
+        # Fallback: XGBoost's built-in TreeSHAP instead of a model-agnostic permutation explainer
+        explainer = BoosterShapExplainer(model, feature_names)
         shap_values = explainer(X_shap)
         shap_values_array = shap_values.values
     
@@ -201,10 +221,9 @@ def explain_single_prediction(model, explainer, X_sample, feature_names, custome
     """
     # Get single customer data
     customer_data = X_sample.iloc[[customer_idx]]
-    dmatrix = xgb.DMatrix(customer_data, enable_categorical=False, feature_names=feature_names)
     
     # Get prediction
-    fraud_prob = model.predict(dmatrix)[0]
+    fraud_prob = model.inplace_predict(customer_data.to_numpy(dtype=np.float32))[0]
     
     # Get SHAP values for this customer
     try:
@@ -332,7 +351,114 @@ def predict_single_transaction(transaction_dict, model, encoder, categorical_col
     
     return result
 
-def predict_new_data(new_df, model, encoder, categorical_cols, feature_columns):
+class BatchPredictor:
+    """
+    Micro-batching scorer for online single-transaction traffic
+    
+    Concurrent predict() calls are queued; a worker thread collects up to
+    max_batch rows (or whatever arrived within max_wait_ms of the first),
+    copies them into one preallocated float32 array and scores the whole
+    batch with a single model.inplace_predict call - no DataFrame or DMatrix
+    per request.
+    
+    Usage:
+        predictor = BatchPredictor(model, encoder, categorical_cols, feature_columns)
+        result = predictor.predict(transaction_dict)  # safe from many threads
+        predictor.close()
+    """
+    
+    def __init__(self, model, encoder, categorical_cols, feature_columns, max_batch=256, max_wait_ms=5):
+        self.model = model
+        self.feature_columns = list(feature_columns)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        
+        # category -> code per categorical column, same codes as ordinal_encode
+        category_codes = {}
+        if encoder and categorical_cols:
+            for col, categories in zip(categorical_cols, encoder.categories_):
+                if len(categories) and categories[-1] is not None and pd.isna(categories[-1]):
+                    categories = categories[:-1]
+                category_codes[col] = {value: code for code, value in enumerate(categories)}
+        self._column_codes = [category_codes.get(col) for col in self.feature_columns]
+        
+        self._buffer = np.empty((max_batch, len(self.feature_columns)), dtype=np.float32)
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='BatchPredictor', daemon=True)
+        self._worker.start()
+    
+    def encode_row(self, transaction_dict):
+        """Encode one transaction into a float32 feature row (missing features -> 0)"""
+        row = np.empty(len(self.feature_columns), dtype=np.float32)
+        for i, (col, codes) in enumerate(zip(self.feature_columns, self._column_codes)):
+            value = transaction_dict.get(col, 0)
+            if codes is not None:
+                row[i] = codes.get(value, np.nan)
+            else:
+                row[i] = np.nan if value is None else value
+        return row
+    
+    def submit(self, transaction_dict):
+        """Queue a transaction; returns a Future resolving to its fraud probability"""
+        future = Future()
+        self._queue.put((self.encode_row(transaction_dict), future))
+        return future
+    
+    def predict(self, transaction_dict, timeout=None):
+        """Score a single transaction; same result keys as predict_single_transaction"""
+        fraud_probability = self.submit(transaction_dict).result(timeout=timeout)
+        return {
+            'fraud_probability': fraud_probability,
+            'fraud_prediction': int(fraud_probability > 0.5),
+            'risk_level': RISK_LABELS[np.searchsorted(RISK_BINS, fraud_probability)],
+            'transaction_data': transaction_dict
+        }
+    
+    def close(self):
+        """Stop the worker once the queued requests are scored"""
+        self._queue.put(None)
+        self._worker.join()
+    
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the stop marker back so the loop exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+    
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect_batch(first)
+            
+            n_rows = len(batch)
+            for i, (row, _) in enumerate(batch):
+                self._buffer[i] = row
+            
+            try:
+                fraud_probabilities = predict_batch(self.model, self._buffer[:n_rows])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            for (_, future), fraud_probability in zip(batch, fraud_probabilities):
+                future.set_result(float(fraud_probability))
+
+def predict_new_data(new_df, model, encoder, categorical_cols, feature_columns, use_gpu=False):
     """
     Make predictions on new data
     
@@ -348,6 +474,8 @@ def predict_new_data(new_df, model, encoder, categorical_cols, feature_columns):
         List of categorical column names
     feature_columns : list
         List of feature column names (same order as training)
+    use_gpu : bool
+        Score through cupy on a CUDA-trained model (needs cupy installed)
     
     Returns:
     --------
@@ -371,36 +499,33 @@ def predict_new_data(new_df, model, encoder, categorical_cols, feature_columns):
     X_new = new_df.drop(columns=[col for col in id_columns if col in new_df.columns], errors='ignore')
     
     # Ensure columns match training data
-    missing_cols = set(feature_columns) - set(X_new.columns)
+    missing_cols = set(feature_columns).difference(X_new.columns)
     if missing_cols:
         print(f"Warning: Missing columns in new data: {missing_cols}")
-        for col in missing_cols:
-            X_new[col] = 0  # Add missing columns with default value
     
-    # Reorder columns to match training
-    X_new = X_new[feature_columns]
+    # Reorder columns to match training, adding missing columns with default value 0
+    X_new = X_new.reindex(columns=feature_columns, fill_value=0)
     
     # Encode categorical features
-    X_new_encoded = X_new.copy()
+    # Fill the float32 matrix the booster reads directly - numeric columns
+    # are copied in, categorical columns encoded in place (no frame copy)
+    X_new_array = np.empty((len(X_new), len(feature_columns)), dtype=np.float32)
+    is_categorical = X_new.columns.isin(categorical_cols if encoder else [])
+    X_new_array[:, ~is_categorical] = X_new.loc[:, ~is_categorical].to_numpy(dtype=np.float32)
     if encoder and categorical_cols:
         print(f"Encoding {len(categorical_cols)} categorical features...")
-        X_new_encoded[categorical_cols] = encoder.transform(X_new[categorical_cols])
-    
-    # Create DMatrix
-    dnew = xgb.DMatrix(X_new_encoded, enable_categorical=False, feature_names=feature_columns)
+        X_new_array[:, X_new.columns.get_indexer(categorical_cols)] = ordinal_encode(X_new, encoder, categorical_cols)
     
     # Make predictions
     print("Generating predictions...")
-    fraud_probabilities = model.predict(dnew)
+    fraud_probabilities = predict_batch(model, X_new_array, use_gpu)
     fraud_predictions = (fraud_probabilities > 0.5).astype(int)
     
     # Create results dataframe
     results_df = new_df.copy()
     results_df['fraud_probability'] = fraud_probabilities
     results_df['fraud_prediction'] = fraud_predictions
-    results_df['risk_level'] = results_df['fraud_probability'].apply(
-        lambda x: 'HIGH' if x > 0.7 else ('MEDIUM' if x > 0.3 else 'LOW')
-    )
+    results_df['risk_level'] = risk_levels(fraud_probabilities)
     
     # Summary statistics
     print(f"\n{'='*70}")
@@ -450,16 +575,12 @@ def predict_and_explain(new_df, model, encoder, explainer, categorical_cols, fea
     X_new = new_df.drop(columns=[col for col in id_columns if col in new_df.columns], errors='ignore')
     
     # Ensure columns match
-    missing_cols = set(feature_columns) - set(X_new.columns)
-    if missing_cols:
-        for col in missing_cols:
-            X_new[col] = 0
-    X_new = X_new[feature_columns]
+    X_new = X_new.reindex(columns=feature_columns, fill_value=0)
     
     # Encode
-    X_new_encoded = X_new.copy()
+    X_new_encoded = X_new
     if encoder and categorical_cols:
-        X_new_encoded[categorical_cols] = encoder.transform(X_new[categorical_cols])
+        X_new_encoded = with_encoded_columns(X_new, ordinal_encode(X_new, encoder, categorical_cols), categorical_cols)
     
     # Get top N highest risk cases
     top_risk_indices = results_df.nlargest(top_n, 'fraud_probability').index
@@ -484,10 +605,13 @@ def predict_and_explain(new_df, model, encoder, explainer, categorical_cols, fea
 # 7. MAIN PIPELINE
 # ============================================================================
 
-def main_pipeline(df):
+def main_pipeline(df, use_gpu=XGB_DEVICE == 'cuda'):
     """
     Complete end-to-end pipeline
+    use_gpu trains with device='cuda' (defaults to on for CUDA builds of XGBoost)
     """
+    device = 'cuda' if use_gpu else 'cpu'
+    
     print("="*70)
     print("XGBOOST FRAUD DETECTION PIPELINE")
     print("="*70)
@@ -495,6 +619,7 @@ def main_pipeline(df):
     # Step 1: Prepare data
     print("\n1. Loading and preparing data...")
     X, y = load_and_prepare_data(df)
+    feature_columns = X.columns.tolist()
     print(f"   Dataset shape: {X.shape}")
     print(f"   Fraud rate: {y.mean():.2%}")
     
@@ -506,27 +631,27 @@ def main_pipeline(df):
     
     # Step 3: Train-test split
     print("\n3. Splitting data...")
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-    X_train_split, X_val, y_train_split, y_val = train_test_split(
-        X_train, y_train, test_size=0.2, random_state=42, stratify=y_train
-    )
+    X_train_split, X_val, X_test, y_train_split, y_val, y_test = stratified_split(X, y)
     
     # Step 4: Encode features
     print("\n4. Encoding categorical features...")
     X_train_enc, X_val_enc, encoder = encode_features(X_train_split, X_val, categorical_cols)
-    X_test_enc, _, _ = encode_features(X_test, X_test, categorical_cols)
+    X_test_enc = X_test
     if encoder:
-        X_test_enc[categorical_cols] = encoder.transform(X_test[categorical_cols])
+        X_test_enc = with_encoded_columns(X_test, ordinal_encode(X_test, encoder, categorical_cols), categorical_cols)
+    # XGBoost works in float32 internally; casting up front halves the bytes it reads
+    X_train_enc, X_val_enc, X_test_enc = (
+        frame.astype(np.float32, copy=False) for frame in (X_train_enc, X_val_enc, X_test_enc)
+    )
     
     # Step 5: Train model
     print("\n5. Training XGBoost model...")
-    model = train_xgboost_model(X_train_enc, y_train_split, X_val_enc, y_val)
+    model, dtrain = train_xgboost_model(X_train_enc, y_train_split, X_val_enc, y_val, categorical_cols, device)
     
     # Step 6: Evaluate model
     print("\n6. Evaluating model on test set...")
-    dtest = xgb.DMatrix(X_test_enc, enable_categorical=False, feature_names=X_test_enc.columns.tolist())
+    # Test set is binned with the training quantiles instead of re-sketching
+    dtest = xgb.QuantileDMatrix(X_test_enc, ref=dtrain, enable_categorical=True, feature_names=feature_columns, feature_types=model.feature_types, max_bin=MAX_BIN)
     y_pred_proba = model.predict(dtest)
     y_pred = (y_pred_proba > 0.5).astype(int)
     
@@ -539,19 +664,19 @@ def main_pipeline(df):
     
     # Step 7: Feature importance
     print("\n7. Analyzing feature importance...")
-    importance_df = plot_feature_importance(model, X.columns.tolist(), top_n=15)
+    importance_df = plot_feature_importance(model, feature_columns, top_n=15)
     print("\nTop 10 Most Important Features:")
     print(importance_df.head(10).to_string(index=False))
     
     # Step 8: SHAP explanations
     print("\n8. Generating SHAP explanations...")
-    explainer, shap_values = explain_with_shap(model, X_test_enc, X.columns.tolist())
+    explainer, shap_values = explain_with_shap(model, X_test_enc, feature_columns)
     
     # Step 9: Explain a high-risk customer
     print("\n9. Explaining individual predictions...")
     # Find a high-risk customer
     high_risk_idx = y_pred_proba.argmax()
-    explain_single_prediction(model, explainer, X_test_enc, X.columns.tolist(), high_risk_idx)
+    explain_single_prediction(model, explainer, X_test_enc, feature_columns, high_risk_idx)
     
     print("\n" + "="*70)
     print("PIPELINE COMPLETE!")
@@ -574,7 +699,7 @@ def main_pipeline(df):
         'explainer': explainer,
         'importance_df': importance_df,
         'categorical_cols': categorical_cols,
-        'feature_columns': X.columns.tolist()
+        'feature_columns': feature_columns
     }
 
 # ============================================================================
@@ -627,6 +752,16 @@ if __name__ == "__main__":
     print("       pipeline_artifacts['categorical_cols'],")
     print("       pipeline_artifacts['feature_columns']")
     print("   )")
+    print("   # Online traffic: one shared BatchPredictor scores concurrent requests together")
+    print("   predictor = BatchPredictor(")
+    print("       pipeline_artifacts['model'],")
+    print("       pipeline_artifacts['encoder'],")
+    print("       pipeline_artifacts['categorical_cols'],")
+    print("       pipeline_artifacts['feature_columns']")
+    print("   )")
+    print("   result = predictor.predict(single_txn)")
+    print("   # Pre-encoded float32 blocks: skip the DataFrame path entirely")
+    print("   fraud_probabilities = predict_batch(pipeline_artifacts['model'], X_block)")
     print("\n4. PREDICTION WITH EXPLANATIONS:")
     print("   results = predict_and_explain(")
     print("       new_data,")
@@ -638,23 +773,20 @@ if __name__ == "__main__":
     print("       top_n=5")
     print("   )")
     print("\n5. SAVE MODEL:")
-    print("   pipeline_artifacts['model'].save_model('fraud_model.json')")
-    print("   import pickle")
-    print("   with open('encoder.pkl', 'wb') as f:")
-    print("       pickle.dump(pipeline_artifacts['encoder'], f)")
+    print("   save_artifacts(pipeline_artifacts)  # fraud_model.ubj + artifacts.joblib")
     print("\n6. LOAD MODEL:")
-    print("   loaded_model = xgb.Booster()")
-    print("   loaded_model.load_model('fraud_model.json')")
-    print("   with open('encoder.pkl', 'rb') as f:")
-    print("       loaded_encoder = pickle.load(f)")
+    print("   pipeline_artifacts = load_artifacts()  # model, encoder, categorical_cols, feature_columns")
     print("="*70)
 
 
-
-df = pd.read_csv(r'E:\VS code stuff\Dataset Generation\Data\banking_cust_dataset.csv')  # Replace with actual data loading
-pipeline_artifacts = main_pipeline(df)
-print("\n5. SAVE MODEL:")
-pipeline_artifacts['model'].save_model(r'E:\VS code stuff\Dataset Generation\model\fraud_model.json')
-import pickle
-with open(r'E:\VS code stuff\Dataset Generation\encoder\encoder.pkl', 'wb') as f:
-    pickle.dump(pipeline_artifacts['encoder'], f)
\ No newline at end of file
+    # Train on the bundled dataset and save the artifacts next to this script
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    df = pd.read_csv(os.path.join(base_dir, 'Data', 'banking_cust_dataset.csv'))
+    pipeline_artifacts = main_pipeline(df)
+    
+    print("\n5. SAVE MODEL:")
+    save_artifacts(
+        pipeline_artifacts,
+        model_path=os.path.join(base_dir, MODEL_PATH),
+        artifacts_path=os.path.join(base_dir, ARTIFACTS_PATH)
+    )
@@ -1,10 +1,111 @@
 # nokia_camara_client.py - Complete Fixed Version
 
+import logging
 import requests
-import random
-from datetime import datetime, timedelta
-from typing import Dict
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config import CAMARA_CONFIG, get_rapidapi_headers, format_phone_for_nokia  # ✅ Import get_rapidapi_headers
+from geo_kernels import NUMBA_AVAILABLE
+
+if NUMBA_AVAILABLE:
+    from geo_kernels import haversine_distance_kernel
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Below this many points the NumPy haversine beats the numba kernel's thread start-up
+NUMBA_HAVERSINE_THRESHOLD = 10000
+
+# Per-call API chatter is DEBUG; enable with logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger("nokia_camara")
+
+
+def _create_http_session() -> requests.Session:
+    """
+    Keep-alive session for CAMARA and Nominatim calls
+    Reusing pooled connections skips a TCP+TLS handshake on every request.
+    Auth headers stay per-request so the RapidAPI key never reaches Nominatim.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(total=2, backoff_factor=0.2)
+    )
+    session.mount('https://', adapter)
+    return session
+
+
+# Built at import so concurrent first requests share one connection pool
+_http_session = _create_http_session()
+
+
+def _parse_json(response: requests.Response):
+    """Decode a JSON response body (with orjson when installed)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def _make_api_call(endpoint: str, payload: dict, method: str = 'POST') -> dict:
+    """Generic API call handler with proper error handling"""
+    
+    if CAMARA_CONFIG['use_mock']:
+        logger.debug("⚠️  MOCK MODE: Simulating API call to %s", endpoint)
+        return None
+    
+    if not CAMARA_CONFIG['api_key']:
+        logger.warning("❌ No API credentials configured. Set RAPIDAPI_KEY in .env")
+        return None
+    
+    try:
+        # ✅ CORRECT: URL uses base_url (p-eu domain)
+        url = f"https://{CAMARA_CONFIG['base_url']}{endpoint}"
+        
+        # ✅ CORRECT: Headers use api_host (nokia domain)
+        headers = get_rapidapi_headers()
+        
+        logger.debug("📡 Making REAL API call to: %s", url)
+        logger.debug("   Headers: x-rapidapi-host=%s", headers.get('x-rapidapi-host'))
+        logger.debug("   Payload: %s", payload)
+        
+        if method == 'POST':
+            response = _http_session.post(url, json=payload, headers=headers, timeout=CAMARA_CONFIG['timeout'])
+        else:
+            response = _http_session.get(url, params=payload, headers=headers, timeout=CAMARA_CONFIG['timeout'])
+        
+        logger.debug("   Status Code: %s", response.status_code)
+        
+        if response.status_code == 200:
+            logger.debug("✅ Real API call successful")
+            return _parse_json(response)
+        elif response.status_code == 401:
+            logger.error("❌ Authentication failed. Check your RAPIDAPI_KEY")
+            logger.error("   Response: %s", response.text[:200])
+            return None
+        elif response.status_code == 404:
+            logger.error("❌ API endpoint not found")
+            logger.error("   URL: %s", url)
+            logger.error("   Response: %s", response.text[:200])
+            return None
+        else:
+            logger.warning("⚠️  API returned %s", response.status_code)
+            logger.warning("   Response: %s", response.text[:200])
+            return None
+            
+    except Exception as e:
+        logger.warning("⚠️  API error: %s", e)
+        return None
 
 
 class NokiaCAMARAClient:
@@ -27,57 +128,18 @@ class NokiaCAMARAClient:
         {'country': 'UK', 'city': 'London', 'lat': 51.5074, 'lon': -0.1278},
     ]
     
-    @staticmethod
-    @staticmethod
-    def _make_api_call(endpoint: str, payload: dict, method: str = 'POST') -> dict:
-        """Generic API call handler with proper error handling"""
-        
-        if CAMARA_CONFIG['use_mock']:
-            print(f"⚠️  MOCK MODE: Simulating API call to {endpoint}")
-            return None
-        
-        if not CAMARA_CONFIG['api_key']:
-            print("❌ No API credentials configured. Set RAPIDAPI_KEY in .env")
-            return None
-        
-        try:
-            # ✅ CORRECT: URL uses base_url (p-eu domain)
-            url = f"https://{CAMARA_CONFIG['base_url']}{endpoint}"
-            
-            # ✅ CORRECT: Headers use api_host (nokia domain)
-            headers = get_rapidapi_headers()
-            
-            print(f"📡 Making REAL API call to: {url}")
-            print(f"   Headers: x-rapidapi-host={headers.get('x-rapidapi-host')}")
-            print(f"   Payload: {payload}")
-            
-            if method == 'POST':
-                response = requests.post(url, json=payload, headers=headers, timeout=CAMARA_CONFIG['timeout'])
-            else:
-                response = requests.get(url, params=payload, headers=headers, timeout=CAMARA_CONFIG['timeout'])
-            
-            print(f"   Status Code: {response.status_code}")
-            
-            if response.status_code == 200:
-                print("✅ Real API call successful")
-                return response.json()
-            elif response.status_code == 401:
-                print("❌ Authentication failed. Check your RAPIDAPI_KEY")
-                print(f"   Response: {response.text[:200]}")
-                return None
-            elif response.status_code == 404:
-                print("❌ API endpoint not found")
-                print(f"   URL: {url}")
-                print(f"   Response: {response.text[:200]}")
-                return None
-            else:
-                print(f"⚠️  API returned {response.status_code}")
-                print(f"   Response: {response.text[:200]}")
-                return None
-                
-        except Exception as e:
-            print(f"⚠️  API error: {e}")
-            return None
+    # Same table as parallel arrays for the vectorized mock path
+    _MOCK_LAT = np.array([loc['lat'] for loc in MOCK_LOCATIONS])
+    _MOCK_LON = np.array([loc['lon'] for loc in MOCK_LOCATIONS])
+    _MOCK_COUNTRY = np.array([loc['country'] for loc in MOCK_LOCATIONS], dtype=object)
+    _MOCK_CITY = np.array([loc['city'] for loc in MOCK_LOCATIONS], dtype=object)
+    
+    _rng = np.random.default_rng()
+    
+    # Shared pool for run_all_checks (the four checks are independent HTTP calls);
+    # created with the class so concurrent first requests can't each build one.
+    # Threads only start as work is submitted.
+    _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='camara')
     
     @classmethod
     def verify_location(cls, phone_number: str, expected_lat: float, expected_lon: float, radius: int = 5000) -> Dict:
@@ -93,7 +155,7 @@ class NokiaCAMARAClient:
         }
         
         # Try real API
-        api_response = cls._make_api_call(
+        api_response = _make_api_call(
             CAMARA_CONFIG['location_endpoint'],
             payload
         )
@@ -109,8 +171,7 @@ class NokiaCAMARAClient:
             distance = cls._haversine_distance(expected_lat, expected_lon, current_lat, current_lon)
             verified = distance < radius
             
-            current_country = cls._reverse_geocode(current_lat, current_lon)
-            current_city = cls._get_city_from_coords(current_lat, current_lon)
+            current_country, current_city = cls._reverse_geocode_full(current_lat, current_lon)
             
             return {
                 'verified': verified,
@@ -138,7 +199,7 @@ class NokiaCAMARAClient:
         }
 
         # Correct endpoint (check API)
-        api_response = cls._make_api_call(
+        api_response = _make_api_call(
             CAMARA_CONFIG["sim_swap_check_endpoint"],  # /passthrough/camara/v1/sim-swap/sim-swap/v0/check
             payload,
             method="POST"
@@ -167,7 +228,7 @@ class NokiaCAMARAClient:
         }
 
         # Correct endpoint and HTTP method
-        api_response = cls._make_api_call(
+        api_response = _make_api_call(
             CAMARA_CONFIG["roaming_endpoint"],  # should be /device-roaming-status/v0/roaming
             payload,
             method="POST"
@@ -203,7 +264,7 @@ class NokiaCAMARAClient:
         }
 
         # Correct endpoint and HTTP method
-        api_response = cls._make_api_call(
+        api_response = _make_api_call(
             CAMARA_CONFIG["device_status_endpoint"],  # /passthrough/camara/v1/device-status/device-status/v0/connectivity
             payload,
             method="POST"
@@ -235,6 +296,53 @@ class NokiaCAMARAClient:
         # fallback mock if API fails
         return cls._mock_device_status()
 
+    @classmethod
+    def run_all_checks(cls, phone_number: str, expected_lat: float, expected_lon: float, radius: int = 5000) -> Dict:
+        """
+        Run the SIM swap, location, roaming and device status checks concurrently
+        Returns {'sim_swap', 'location', 'roaming', 'device_status'} -> check result
+        """
+        futures = {
+            'sim_swap': cls._executor.submit(cls.check_sim_swap, phone_number),
+            'location': cls._executor.submit(cls.verify_location, phone_number, expected_lat, expected_lon, radius),
+            'roaming': cls._executor.submit(cls.check_device_roaming, phone_number),
+            'device_status': cls._executor.submit(cls.check_device_status, phone_number)
+        }
+        return {check: future.result() for check, future in futures.items()}
+    
+    @classmethod
+    def run_all_checks_batch(cls, phone_numbers: List[str], expected_lat: float, expected_lon: float,
+                             radius: int = 5000, max_workers: int = 64) -> List[Dict]:
+        """run_all_checks for many phones at once, results in input order"""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(
+                lambda phone: cls.run_all_checks(phone, expected_lat, expected_lon, radius),
+                phone_numbers
+            ))
+
+    @classmethod
+    def bulk_verify(cls, phone_numbers: List[str], expected_lats, expected_lons,
+                    radius: int = 5000, max_workers: int = 64) -> pd.DataFrame:
+        """
+        Run all four checks for many phones and collate them into one DataFrame
+        One row per phone; columns are '<check>.<field>' (e.g. 'location.distance_meters',
+        'sim_swap.swapped') so downstream features can work on whole columns.
+        expected_lats / expected_lons may be scalars or one value per phone.
+        """
+        n_phones = len(phone_numbers)
+        lats = np.broadcast_to(np.asarray(expected_lats, dtype=float), n_phones)
+        lons = np.broadcast_to(np.asarray(expected_lons, dtype=float), n_phones)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                lambda args: cls.run_all_checks(args[0], float(args[1]), float(args[2]), radius),
+                zip(phone_numbers, lats, lons)
+            ))
+        
+        checks = pd.json_normalize(results)
+        checks.insert(0, 'phone_number', list(phone_numbers))
+        return checks
+
     
     # ===== MOCK FALLBACK METHODS =====
     
@@ -244,8 +352,8 @@ class NokiaCAMARAClient:
         phone_hash = sum(ord(c) for c in phone_number) % len(cls.MOCK_LOCATIONS)
         mock_location = cls.MOCK_LOCATIONS[phone_hash]
         
-        lat_offset = random.uniform(-0.5, 0.5)
-        lon_offset = random.uniform(-0.5, 0.5)
+        lat_offset = cls._rng.uniform(-0.5, 0.5)
+        lon_offset = cls._rng.uniform(-0.5, 0.5)
         
         current_lat = mock_location['lat'] + lat_offset
         current_lon = mock_location['lon'] + lon_offset
@@ -265,69 +373,120 @@ class NokiaCAMARAClient:
             'status': 'mock'
         }
     
-    @staticmethod
-    def _mock_sim_swap() -> Dict:
-        """Mock SIM swap data"""
-        swapped = random.random() < 0.15
-        if swapped:
-            days_ago = random.randint(1, 10)
-            return {
-                'swapped': True,
-                'last_swap_date': f"{days_ago} days ago",
-                'risk_score': 0.8 if days_ago <= 3 else 0.5,
-                'status': 'mock'
-            }
+    @classmethod
+    def _mock_location_verification_batch(cls, phone_numbers: List[str], expected_lat: float,
+                                          expected_lon: float, radius: int) -> Dict:
+        """
+        _mock_location_verification for many phones at once
+        Returns the same keys with one array entry per phone (status stays a scalar)
+        """
+        n_phones = len(phone_numbers)
+        
+        # Sum of code points per phone, from one prefix sum over all of them joined
+        lengths = np.fromiter(map(len, phone_numbers), dtype=np.int64, count=n_phones)
+        code_points = np.frombuffer(''.join(phone_numbers).encode('utf-32-le'), dtype=np.uint32)
+        prefix = np.concatenate(([0], np.cumsum(code_points, dtype=np.int64)))
+        ends = np.cumsum(lengths)
+        idx = (prefix[ends] - prefix[ends - lengths]) % len(cls.MOCK_LOCATIONS)
+        
+        current_lat = cls._MOCK_LAT[idx] + cls._rng.uniform(-0.5, 0.5, n_phones)
+        current_lon = cls._MOCK_LON[idx] + cls._rng.uniform(-0.5, 0.5, n_phones)
+        
+        distance = cls._haversine_distance_batch(expected_lat, expected_lon, current_lat, current_lon)
+        verified = distance < radius
+        
         return {
-            'swapped': False,
-            'last_swap_date': 'No recent swap',
-            'risk_score': 0.0,
+            'verified': verified,
+            'distance_meters': distance.astype(np.int64),
+            'current_lat': current_lat,
+            'current_lon': current_lon,
+            'current_country': cls._MOCK_COUNTRY[idx],
+            'current_city': cls._MOCK_CITY[idx],
+            'expected_country': np.full(n_phones, 'India', dtype=object),
+            'risk_score': np.where(verified, 0.0, np.minimum(distance / 10000, 1.0)),
             'status': 'mock'
         }
     
+    # Mock draws come from cls._rng in bulk; the scalar mocks take row 0 of a batch of 1
+    _ROAMING_NETWORKS = np.array(['Vodafone UK', 'T-Mobile DE', 'China Mobile', 'Etisalat UAE'], dtype=object)
+    _ROAMING_COUNTRIES = np.array(['UK', 'Germany', 'China', 'UAE'], dtype=object)
+    _DEVICE_STATUSES = np.array(['SMS', 'DATA', 'NOT_CONNECTED'], dtype=object)
+    _DEVICE_STATUS_WEIGHTS = [0.15, 0.75, 0.10]
+    _SIGNAL_STRENGTHS = np.array(['Excellent', 'Good', 'Fair'], dtype=object)
+    
     @staticmethod
-    def _mock_roaming() -> Dict:
-        """Mock roaming data"""
-        is_roaming = random.random() < 0.2
-        if is_roaming:
-            networks = ['Vodafone UK', 'T-Mobile DE', 'China Mobile', 'Etisalat UAE']
-            countries = ['UK', 'Germany', 'China', 'UAE']
-            idx = random.randint(0, len(networks) - 1)
-            return {
-                'roaming': True,
-                'home_network': 'Airtel IN',
-                'current_network': networks[idx],
-                'roaming_country': countries[idx],
-                'status': 'mock'
-            }
+    def _batch_row(batch: Dict, i: int = 0) -> Dict:
+        """Pick row i out of a dict-of-arrays mock batch as plain Python values"""
+        row = {}
+        for key, value in batch.items():
+            if isinstance(value, np.ndarray):
+                value = value[i]
+                if isinstance(value, np.generic):
+                    value = value.item()
+            row[key] = value
+        return row
+    
+    @classmethod
+    def _mock_sim_swap_batch(cls, n: int) -> Dict:
+        """Mock SIM swap data for n phones (dict of arrays)"""
+        swapped = cls._rng.random(n) < 0.15
+        days_ago = cls._rng.integers(1, 11, n)
+        swap_dates = np.array([f"{days} days ago" for days in days_ago], dtype=object)
         return {
-            'roaming': False,
-            'home_network': 'Airtel IN',
-            'current_network': 'Airtel IN',
-            'roaming_country': None,
+            'swapped': swapped,
+            'last_swap_date': np.where(swapped, swap_dates, 'No recent swap'),
+            'risk_score': np.where(swapped, np.where(days_ago <= 3, 0.8, 0.5), 0.0),
             'status': 'mock'
         }
     
-    @staticmethod
-    def _mock_device_status() -> Dict:
-        """Mock device status data"""
-        statuses = ['SMS', 'DATA', 'NOT_CONNECTED']
-        weights = [0.15, 0.75, 0.10]
-        device_status = random.choices(statuses, weights=weights)[0]
+    @classmethod
+    def _mock_sim_swap(cls) -> Dict:
+        """Mock SIM swap data"""
+        return cls._batch_row(cls._mock_sim_swap_batch(1))
+    
+    @classmethod
+    def _mock_roaming_batch(cls, n: int) -> Dict:
+        """Mock roaming data for n phones (dict of arrays)"""
+        is_roaming = cls._rng.random(n) < 0.2
+        idx = cls._rng.integers(0, len(cls._ROAMING_NETWORKS), n)
+        return {
+            'roaming': is_roaming,
+            'home_network': np.full(n, 'Airtel IN', dtype=object),
+            'current_network': np.where(is_roaming, cls._ROAMING_NETWORKS[idx], 'Airtel IN'),
+            'roaming_country': np.where(is_roaming, cls._ROAMING_COUNTRIES[idx], None),
+            'status': 'mock'
+        }
+    
+    @classmethod
+    def _mock_roaming(cls) -> Dict:
+        """Mock roaming data"""
+        return cls._batch_row(cls._mock_roaming_batch(1))
+    
+    @classmethod
+    def _mock_device_status_batch(cls, n: int) -> Dict:
+        """Mock device status data for n phones (dict of arrays)"""
+        device_status = cls._rng.choice(cls._DEVICE_STATUSES, size=n, p=cls._DEVICE_STATUS_WEIGHTS)
+        connected = device_status != 'NOT_CONNECTED'
         
-        if device_status == 'NOT_CONNECTED':
-            hours_ago = random.randint(2, 48)
-            last_seen = (datetime.now() - timedelta(hours=hours_ago)).strftime('%Y-%m-%d %H:%M:%S')
-        else:
-            last_seen = 'Currently Active'
+        hours_ago = cls._rng.integers(2, 49, n).astype('timedelta64[h]')
+        last_seen_at = np.datetime64(datetime.now(), 's') - hours_ago
+        last_seen = np.char.replace(np.datetime_as_string(last_seen_at, unit='s'), 'T', ' ').astype(object)
         
         return {
             'connection_status': device_status,
-            'last_seen': last_seen,
-            'network_type': '4G' if device_status == 'DATA' else 'GSM' if device_status == 'SMS' else 'Unknown',
-            'signal_strength': random.choice(['Excellent', 'Good', 'Fair']) if device_status != 'NOT_CONNECTED' else 'No Signal',
+            'last_seen': np.where(connected, 'Currently Active', last_seen),
+            'network_type': np.select(
+                [device_status == 'DATA', device_status == 'SMS'], ['4G', 'GSM'], 'Unknown'
+            ).astype(object),
+            'signal_strength': np.where(connected, cls._rng.choice(cls._SIGNAL_STRENGTHS, size=n), 'No Signal'),
             'status': 'mock'
         }
     
+    @classmethod
+    def _mock_device_status(cls) -> Dict:
+        """Mock device status data"""
+        return cls._batch_row(cls._mock_device_status_batch(1))
+    
     # ===== HELPER METHODS =====
     
     @staticmethod
@@ -347,33 +506,61 @@ class NokiaCAMARAClient:
         return R * c
     
     @staticmethod
-    def _reverse_geocode(lat: float, lon: float) -> str:
-        """Convert coordinates to country"""
+    def _haversine_distance_batch(lat1, lon1, lat2, lon2) -> np.ndarray:
+        """
+        Vectorized _haversine_distance: distances in meters between coordinate arrays
+        Arguments broadcast, so one expected location can be checked against many.
+        Large batches run on the parallel numba kernel when numba is installed.
+        """
+        if NUMBA_AVAILABLE and np.size(lat2) > NUMBA_HAVERSINE_THRESHOLD:
+            coords = np.broadcast_arrays(*(np.asarray(c, dtype=np.float64) for c in (lat1, lon1, lat2, lon2)))
+            shape = coords[0].shape
+            return haversine_distance_kernel(*(np.ascontiguousarray(c).ravel() for c in coords)).reshape(shape)
+        
+        R = 6371000
+        φ1 = np.radians(lat1)
+        φ2 = np.radians(lat2)
+        Δφ = φ2 - φ1
+        Δλ = np.radians(np.subtract(lon2, lon1))
+        
+        a = np.sin(Δφ/2)**2 + np.cos(φ1) * np.cos(φ2) * np.sin(Δλ/2)**2
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+        
+        return R * c
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _nominatim(lat_q: float, lon_q: float) -> dict:
+        """
+        Nominatim reverse lookup for coordinates rounded to 2 decimals (~1 km tile)
+        Returns the address dict; failures raise so they are never cached
+        """
+        url = "https://nominatim.openstreetmap.org/reverse"
+        params = {'lat': lat_q, 'lon': lon_q, 'format': 'json'}
+        headers = {'User-Agent': 'FraudGuardAI/1.0'}
+        
+        response = _http_session.get(url, params=params, headers=headers, timeout=5)
+        response.raise_for_status()
+        return _parse_json(response).get('address', {})
+    
+    @staticmethod
+    def _reverse_geocode_full(lat: float, lon: float) -> Tuple[str, str]:
+        """Convert coordinates to (country, city) from a single lookup"""
         try:
-            url = "https://nominatim.openstreetmap.org/reverse"
-            params = {'lat': lat, 'lon': lon, 'format': 'json'}
-            headers = {'User-Agent': 'FraudGuardAI/1.0'}
-            
-            response = requests.get(url, params=params, headers=headers, timeout=5)
-            if response.status_code == 200:
-                return response.json().get('address', {}).get('country', 'Unknown')
+            address = NokiaCAMARAClient._nominatim(round(lat, 2), round(lon, 2))
         except:
-            pass
-        return 'Unknown'
+            return 'Unknown', 'Unknown'
+        country = address.get('country', 'Unknown')
+        city = (address.get('city') or address.get('town') or 
+               address.get('village') or 'Unknown')
+        return country, city
+    
+    @staticmethod
+    def _reverse_geocode(lat: float, lon: float) -> str:
+        """Convert coordinates to country"""
+        return NokiaCAMARAClient._reverse_geocode_full(lat, lon)[0]
     
     @staticmethod
     def _get_city_from_coords(lat: float, lon: float) -> str:
         """Convert coordinates to city"""
-        try:
-            url = "https://nominatim.openstreetmap.org/reverse"
-            params = {'lat': lat, 'lon': lon, 'format': 'json'}
-            headers = {'User-Agent': 'FraudGuardAI/1.0'}
-            
-            response = requests.get(url, params=params, headers=headers, timeout=5)
-            if response.status_code == 200:
-                address = response.json().get('address', {})
-                return (address.get('city') or address.get('town') or 
-                       address.get('village') or 'Unknown')
-        except:
-            pass
-        return 'Unknown'
\ No newline at end of file
+        return NokiaCAMARAClient._reverse_geocode_full(lat, lon)[1]
\ No newline at end of file
@@ -6,7 +6,12 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from io import BytesIO
+import os
+import tempfile
 from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
+import numpy as np
 
 # --- NEW IMPORTS FOR CHARTS ---
 from reportlab.graphics.shapes import Drawing, String
@@ -15,9 +20,166 @@ from reportlab.graphics.charts.barcharts import VerticalBarChart
 from reportlab.graphics.charts.axes import XCategoryAxis, YValueAxis
 from reportlab.graphics.charts.legends import Legend
 
+# Optional: matplotlib renders the pie to a cached PNG (ReportLab drawing otherwise)
+try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from PIL import Image as PILImage
+    MATPLOTLIB_AVAILABLE = True
+except ImportError:
+    MATPLOTLIB_AVAILABLE = False
+
+# Risk colors, parsed once: high, medium, low
+RISK_HEX = ('#ef4444', '#f59e0b', '#10b981')
+_COLOR_HIGH, _COLOR_MED, _COLOR_LOW = (colors.HexColor(hex_value) for hex_value in RISK_HEX)
+
+# Report palette
+_COLOR_DARK = colors.HexColor('#1a1f29')
+_COLOR_BLUE = colors.HexColor('#4a9eff')
+_COLOR_PURPLE = colors.HexColor('#8b5cf6')
+_COLOR_ROW_LIGHT = colors.HexColor('#F5F5F5')
+_COLOR_ROW_DARK = colors.HexColor('#E0E0E0')
+
+# Shared read-only default for missing CAMARA sections (no fresh {} per lookup)
+_EMPTY = MappingProxyType({})
+
+# ===================================
+# REPORT STYLES (built once, shared by every report)
+# ===================================
+_STYLES = getSampleStyleSheet()
+
+_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_STYLES['Heading1'],
+    fontSize=24,
+    textColor=_COLOR_DARK,
+    spaceAfter=30,
+    alignment=TA_CENTER,
+    fontName='Helvetica-Bold'
+)
+
+_HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=_STYLES['Heading2'],
+    fontSize=16,
+    textColor=_COLOR_BLUE,
+    spaceAfter=12,
+    spaceBefore=12,
+    fontName='Helvetica-Bold'
+)
+
+_BODY_STYLE = ParagraphStyle(
+    'CustomBody',
+    parent=_STYLES['BodyText'],
+    fontSize=10,
+    textColor=_COLOR_DARK,
+    spaceAfter=6
+)
+
+_CHART_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+_TXN_TABLE_STYLE = TableStyle([
+    # Header row
+    ('BACKGROUND', (0, 0), (-1, 0), _COLOR_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    
+    # Data rows - base styling
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    
+    # Alternating row colors from row 1 (header is row 0), whatever the row count
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [_COLOR_ROW_LIGHT, _COLOR_ROW_DARK]),
+])
+
+_RISK_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), _COLOR_PURPLE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), _COLOR_ROW_LIGHT),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+# High-risk detail blocks: plain-string label/value rows, no markup to parse
+_DETAIL_TABLE_CMDS = [
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('TEXTCOLOR', (0, 0), (-1, -1), _COLOR_DARK),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('TOPPADDING', (0, 0), (-1, -1), 1),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+    # "Transaction #N" title row
+    ('SPAN', (0, 0), (-1, 0)),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+]
+_DETAIL_TABLE_STYLE = TableStyle(_DETAIL_TABLE_CMDS)
+# Same, with the "CAMARA Flags" sub-heading (row 4) in bold
+_DETAIL_FLAGS_TABLE_STYLE = TableStyle(_DETAIL_TABLE_CMDS + [
+    ('SPAN', (0, 4), (-1, 4)),
+    ('FONTNAME', (0, 4), (-1, 4), 'Helvetica-Bold'),
+    ('TOPPADDING', (0, 4), (-1, 4), 6),
+])
+
+def _figure_png(fig):
+    """
+    Close fig and return it as opaque RGB PNG bytes
+    Without an alpha channel ReportLab embeds one image stream per chart
+    instead of an image plus a soft mask.
+    """
+    fig.canvas.draw()
+    rgb = np.asarray(fig.canvas.buffer_rgba())[..., :3]
+    plt.close(fig)
+    
+    buf = BytesIO()
+    PILImage.fromarray(rgb).save(buf, format='PNG')
+    return buf.getvalue()
+
 # ===================================
 # HELPER FUNCTION: CREATE PIE CHART
 # ===================================
+@lru_cache(maxsize=256)
+def _render_pie_png(high, medium, low):
+    """Render the risk level pie as PNG bytes (cached per count triple)."""
+    # Each level keeps its own color when zero slices are dropped
+    counts = [
+        (name, count, color)
+        for name, count, color in zip(('High', 'Medium', 'Low'), (high, medium, low), RISK_HEX)
+        if count > 0
+    ]
+    data = [count for _, count, _ in counts]
+    
+    # Same 300x150pt footprint as the ReportLab drawing, rendered at 2x for print
+    fig, ax = plt.subplots(figsize=(300 / 72, 150 / 72), dpi=144)
+    wedges, _ = ax.pie(
+        data,
+        labels=[name for name, _, _ in counts],
+        colors=[color for _, _, color in counts],
+        wedgeprops={'linewidth': 0.5, 'edgecolor': 'black'},
+        textprops={'fontsize': 7}
+    )
+    ax.set_aspect('equal')
+    ax.legend(wedges, [f'{name} ({count})' for name, count, _ in counts],
+              loc='center left', bbox_to_anchor=(1.05, 0.5), fontsize=7, frameon=False)
+    fig.suptitle('Risk Level Distribution', fontsize=10, fontweight='bold')
+    
+    return _figure_png(fig)
+
 def create_pie_chart(stats):
     """Creates a Pie chart for risk level distribution."""
     drawing = Drawing(300, 150)
@@ -30,18 +192,23 @@ def create_pie_chart(stats):
     data = [high, medium, low]
     labels = [f'High ({high})', f'Medium ({medium})', f'Low ({low})']
     
-    # Filter out zero values
+    # Filter out zero values (each level keeps its own color)
     non_zero_data = []
     non_zero_labels = []
-    for d, l in zip(data, labels):
+    non_zero_colors = []
+    for d, l, c in zip(data, labels, (_COLOR_HIGH, _COLOR_MED, _COLOR_LOW)):
         if d > 0:
             non_zero_data.append(d)
             non_zero_labels.append(l)
+            non_zero_colors.append(c)
     
     if not non_zero_data:
         drawing.add(String(150, 75, "No transaction data.", textAnchor='middle', fillColor=colors.gray))
         return drawing
 
+    if MATPLOTLIB_AVAILABLE:
+        return Image(BytesIO(_render_pie_png(high, medium, low)), width=300, height=150)
+
     pie = Pie()
     pie.x = 0
     pie.y = 10
@@ -52,11 +219,8 @@ def create_pie_chart(stats):
     pie.slices.strokeWidth = 0.5
     
     # Set colors for slices
-    pie.slices[0].fillColor = colors.HexColor('#ef4444') # High
-    if len(pie.data) > 1:
-        pie.slices[1].fillColor = colors.HexColor('#f59e0b') # Medium
-    if len(pie.data) > 2:
-        pie.slices[2].fillColor = colors.HexColor('#10b981') # Low
+    for i, color in enumerate(non_zero_colors):
+        pie.slices[i].fillColor = color
         
     drawing.add(pie)
     
@@ -65,13 +229,7 @@ def create_pie_chart(stats):
     legend.x = 150
     legend.y = 110
     legend.columnMaximum = 10
-    legend.colorNamePairs = [
-        (colors.HexColor('#ef4444'), non_zero_labels[0])
-    ]
-    if len(non_zero_labels) > 1:
-        legend.colorNamePairs.append((colors.HexColor('#f59e0b'), non_zero_labels[1]))
-    if len(non_zero_labels) > 2:
-        legend.colorNamePairs.append((colors.HexColor('#10b981'), non_zero_labels[2]))
+    legend.colorNamePairs = list(zip(non_zero_colors, non_zero_labels))
 
     drawing.add(legend)
     
@@ -83,6 +241,25 @@ def create_pie_chart(stats):
 # ===================================
 # HELPER FUNCTION: CREATE BAR CHART
 # ===================================
+@lru_cache(maxsize=256)
+def _render_bar_png(scores, buckets):
+    """Render the risk score bars as PNG bytes (cached per tuple of scores and risk buckets)."""
+    positions = np.arange(len(scores))
+    bar_hex = np.array(RISK_HEX[::-1])[list(buckets)]
+    
+    # Same 450x180pt footprint as the ReportLab drawing, rendered at 2x for print
+    fig, ax = plt.subplots(figsize=(450 / 72, 180 / 72), dpi=144)
+    ax.bar(positions, scores, color=bar_hex, edgecolor='black', linewidth=0.5)
+    ax.set_xticks(positions, [f"Txn {i+1}" for i in positions], fontsize=6)
+    ax.set_ylim(0, 100)
+    ax.set_yticks(range(0, 101, 20))
+    ax.tick_params(axis='y', labelsize=7)
+    ax.set_ylabel('Risk %', fontsize=8)
+    ax.set_title('Risk Score Trend (Last 15 Txns)', fontsize=10, fontweight='bold')
+    fig.tight_layout()
+    
+    return _figure_png(fig)
+
 def create_bar_chart(logs):
     """Creates a Bar chart for risk score trend."""
     drawing = Drawing(450, 180)
@@ -95,6 +272,14 @@ def create_bar_chart(logs):
         return drawing
         
     data = [(log.get('fraud_probability', 0) * 100) for log in logs_to_chart]
+    # Risk bucket per bar from the exact scores: <= 40 low, <= 75 medium, above that high
+    buckets = np.digitize(data, [40, 75], right=True)
+    
+    if MATPLOTLIB_AVAILABLE:
+        # Heights to 0.1% (the precision the report prints) so repeat reports hit the cache;
+        # colors come from the unrounded buckets so scores like 40.04 stay medium
+        heights = tuple(round(score, 1) for score in data)
+        return Image(BytesIO(_render_bar_png(heights, tuple(buckets.tolist()))), width=450, height=180)
     
     bar_chart = VerticalBarChart()
     bar_chart.x = 50
@@ -105,14 +290,10 @@ def create_bar_chart(logs):
     bar_chart.groupSpacing = 10
     bar_chart.barSpacing = 2
     
-    # Set bar colors based on risk
-    for i, val in enumerate(data):
-        if val > 75:
-            bar_chart.bars[(0, i)].fillColor = colors.HexColor('#ef4444')
-        elif val > 40:
-            bar_chart.bars[(0, i)].fillColor = colors.HexColor('#f59e0b')
-        else:
-            bar_chart.bars[(0, i)].fillColor = colors.HexColor('#10b981')
+    # Set bar colors based on risk bucket
+    bar_colors = (_COLOR_LOW, _COLOR_MED, _COLOR_HIGH)
+    for i, bucket in enumerate(buckets):
+        bar_chart.bars[(0, i)].fillColor = bar_colors[bucket]
 
     # X-Axis (Categories)
     bar_chart.categoryAxis = XCategoryAxis()
@@ -138,41 +319,24 @@ def create_bar_chart(logs):
 # ===================================
 # MAIN PDF GENERATION FUNCTION
 # ===================================
-def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explanation=None):
-    buffer = BytesIO()
+def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explanation=None, out_stream=None):
+    """
+    Build the investigation PDF
+    Writes into out_stream when given (any writable binary file) and returns it;
+    otherwise returns a BytesIO rewound to the start.
+    """
+    buffer = out_stream if out_stream is not None else BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
     
     elements = []
-    styles = getSampleStyleSheet()
-    
-    # [Keep all existing styles from original function]
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1a1f29'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
     
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        textColor=colors.HexColor('#4a9eff'),
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName='Helvetica-Bold'
-    )
+    # One generation time for the whole report (title page and AI badge)
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
-    body_style = ParagraphStyle(
-        'CustomBody',
-        parent=styles['BodyText'],
-        fontSize=10,
-        textColor=colors.HexColor('#1a1f29'),
-        spaceAfter=6
-    )
+    # Module-level styles (see REPORT STYLES above)
+    title_style = _TITLE_STYLE
+    heading_style = _HEADING_STYLE
+    body_style = _BODY_STYLE
         
     # ===================================
     # TITLE PAGE
@@ -187,7 +351,7 @@ def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explan
     investigation_info = f"""
     <para align=center>
     <b>Phone Number:</b> {phone_number}<br/>
-    <b>Report Generated:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}<br/>
+    <b>Report Generated:</b> {generated_at}<br/>
     <b>Total Transactions:</b> {stats['total_txns']}<br/>
     <b>High Risk Alerts:</b> {stats['high_risk_txns']}<br/>
     <b>Medium Risk Alerts:</b> {stats.get('medium_risk_txns', 0)}
@@ -256,9 +420,7 @@ def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explan
         [create_pie_chart(stats), create_bar_chart(logs)]
     ]
     chart_table = Table(chart_table_data, colWidths=[3*inch, 4.5*inch])
-    chart_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    chart_table.setStyle(_CHART_TABLE_STYLE)
     
     elements.append(chart_table)
     elements.append(Spacer(1, 0.1*inch))
@@ -273,21 +435,41 @@ def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explan
         ['Timestamp', 'Amount', 'Risk Score', 'Risk Level', 'CAMARA Flags']
     ]
 
-    # Get only first 10 transactions
-    transactions_to_show = logs[:10]
+    # One pass over the logs: CAMARA counters over all of them, plus the
+    # first 5 high-risk logs and the rows for the first 10 transactions
+    sim_swap_count = 0
+    location_mismatch_count = 0
+    roaming_count = 0
+    offline_count = 0
+    high_risk_logs = []
+
+    for idx, log in enumerate(logs):
+        camara_data = log.get('camara_data') or _EMPTY
+        sim_swapped = bool((camara_data.get('sim_swap') or _EMPTY).get('swapped'))
+        location_mismatch = not (camara_data.get('location') or _EMPTY).get('verified', True)
+        roaming = bool((camara_data.get('roaming') or _EMPTY).get('roaming'))
+        conn_status = (camara_data.get('device_status') or _EMPTY).get('connection_status')
+
+        sim_swap_count += sim_swapped
+        location_mismatch_count += location_mismatch
+        roaming_count += roaming
+        offline_count += conn_status == 'NOT_CONNECTED'
+
+        if log['risk_level'] == 'High Risk' and len(high_risk_logs) < 5:
+            high_risk_logs.append(log)
+
+        if idx >= 10:
+            continue
 
-    # Add transaction rows
-    for log in transactions_to_show:
         camara_flags = []
-        if log.get('camara_data', {}).get('sim_swap', {}).get('swapped'):
+        if sim_swapped:
             camara_flags.append('SIM')
-        if not log.get('camara_data', {}).get('location', {}).get('verified', True):
+        if location_mismatch:
             camara_flags.append('LOC')
-        if log.get('camara_data', {}).get('roaming', {}).get('roaming'):
+        if roaming:
             camara_flags.append('ROAM')
         
         # Add Offline/SMS flags
-        conn_status = log.get('camara_data', {}).get('device_status', {}).get('connection_status')
         if conn_status == 'NOT_CONNECTED':
             camara_flags.append('OFFLINE')
         elif conn_status == 'SMS':
@@ -310,33 +492,7 @@ def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explan
     # Create ONE table with all the data
     table = Table(table_data, colWidths=[1.5*inch, 1*inch, 1*inch, 1*inch, 1.5*inch], repeatRows=1)
 
-    # Build table style dynamically
-    table_style = [
-        # Header row
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a9eff')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        
-        # Data rows - base styling
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]
-
-    # Add alternating row colors dynamically based on actual row count
-    for i in range(1, len(table_data)):  # Start from row 1 (skip header at row 0)
-        if i % 2 == 1:  # Odd rows (1, 3, 5, ...)
-            table_style.append(('BACKGROUND', (0, i), (-1, i), colors.HexColor('#F5F5F5')))
-        else:  # Even rows (2, 4, 6, ...)
-            table_style.append(('BACKGROUND', (0, i), (-1, i), colors.HexColor('#E0E0E0')))
-
-    table.setStyle(TableStyle(table_style))
+    table.setStyle(_TXN_TABLE_STYLE)
 
     # Add the table ONCE
     elements.append(table)
@@ -347,13 +503,9 @@ def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explan
     elements.append(PageBreak())
     elements.append(Paragraph("CAMARA Network Intelligence Analysis", heading_style))
     
-    # Aggregate CAMARA data
-    sim_swap_count = sum(1 for log in logs if log.get('camara_data', {}).get('sim_swap', {}).get('swapped'))
-    location_mismatch_count = sum(1 for log in logs if not log.get('camara_data', {}).get('location', {}).get('verified', True))
-    roaming_count = sum(1 for log in logs if log.get('camara_data', {}).get('roaming', {}).get('roaming'))
-    offline_count = sum(1 for log in logs if log.get('camara_data', {}).get('device_status', {}).get('connection_status') == 'NOT_CONNECTED')
-    
-    camara_summary = f"""
+    # CAMARA counters come from the single pass above
+    # Markup fragments are collected in a list and joined once
+    summary_parts = [f"""
     <b>Network Behavior Summary:</b><br/>
     <br/>
     • SIM Swap Detections: {sim_swap_count}<br/>
@@ -362,57 +514,62 @@ def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explan
     • Device Offline Instances: {offline_count}<br/>
     <br/>
     <b>Analysis:</b><br/>
-    """
+    """]
     
     has_anomaly = False
     if sim_swap_count > 0:
-        camara_summary += "⚠️ <b>CRITICAL:</b> SIM swap activity detected. This is a strong indicator of account takeover fraud.<br/>"
+        summary_parts.append("⚠️ <b>CRITICAL:</b> SIM swap activity detected. This is a strong indicator of account takeover fraud.<br/>")
         has_anomaly = True
     
     if location_mismatch_count > 0:
-        camara_summary += "⚠️ <b>WARNING:</b> Device location does not match KYC records. Possible use of VPN or unauthorized remote access.<br/>"
+        summary_parts.append("⚠️ <b>WARNING:</b> Device location does not match KYC records. Possible use of VPN or unauthorized remote access.<br/>")
         has_anomaly = True
     
     if offline_count > 0:
-        camara_summary += "⚠️ <b>WARNING:</b> Device was offline for {offline_count} transaction(s). This is highly irregular and a common fraud tactic.<br/>"
+        summary_parts.append(f"⚠️ <b>WARNING:</b> Device was offline for {offline_count} transaction(s). This is highly irregular and a common fraud tactic.<br/>")
         has_anomaly = True
         
     if roaming_count > 0:
-        camara_summary += "⚠️ <b>NOTICE:</b> Device roaming detected. Verify if customer is traveling, as this can be used to mask location.<br/>"
+        summary_parts.append("⚠️ <b>NOTICE:</b> Device roaming detected. Verify if customer is traveling, as this can be used to mask location.<br/>")
         has_anomaly = True
     
     if not has_anomaly:
-        camara_summary += "✅ All network behavior checks passed. No anomalies detected.<br/>"
+        summary_parts.append("✅ All network behavior checks passed. No anomalies detected.<br/>")
     
-    elements.append(Paragraph(camara_summary, body_style))
+    elements.append(Paragraph(''.join(summary_parts), body_style))
     elements.append(Spacer(1, 0.3*inch))
     
     # ===================================
     # DETAILED TRANSACTION ANALYSIS
     # ===================================
-    high_risk_logs = [log for log in logs if log['risk_level'] == 'High Risk']
-    
     if high_risk_logs:
         elements.append(Paragraph("High Risk Transaction Details", heading_style))
         
-        for i, log in enumerate(high_risk_logs[:5], 1):  # Show first 5 high-risk
-            detail_text = f"""
-            <b>Transaction #{i}</b><br/>
-            Timestamp: {log['timestamp']}<br/>
-            Amount: ${log['transaction_amount']:.2f}<br/>
-            Risk Score: {log['fraud_probability']*100:.1f}%<br/>
-            """
+        for i, log in enumerate(high_risk_logs, 1):  # First 5 high-risk (capped above)
+            rows = [
+                [f"Transaction #{i}", ''],
+                ['Timestamp:', log['timestamp']],
+                ['Amount:', f"${log['transaction_amount']:.2f}"],
+                ['Risk Score:', f"{log['fraud_probability']*100:.1f}%"],
+            ]
+            detail_style = _DETAIL_TABLE_STYLE
             
             # Add CAMARA flags
-            if log.get('camara_data'):
-                detail_text += "<br/><b>CAMARA Flags:</b><br/>"
-                if log['camara_data'].get('sim_swap', {}).get('swapped'):
-                    detail_text += f"• SIM Swap: {log['camara_data']['sim_swap'].get('last_swap_date')}<br/>"
-                if not log['camara_data'].get('location', {}).get('verified', True):
-                    distance = log['camara_data']['location'].get('distance_meters', 0)
-                    detail_text += f"• Location Mismatch: {distance/1000:.1f} km from KYC<br/>"
+            camara_data = log.get('camara_data')
+            if camara_data:
+                rows.append(['CAMARA Flags:', ''])
+                detail_style = _DETAIL_FLAGS_TABLE_STYLE
+                sim_swap = camara_data.get('sim_swap') or _EMPTY
+                location = camara_data.get('location') or _EMPTY
+                if sim_swap.get('swapped'):
+                    rows.append(['• SIM Swap:', str(sim_swap.get('last_swap_date'))])
+                if not location.get('verified', True):
+                    distance = location.get('distance_meters', 0)
+                    rows.append(['• Location Mismatch:', f"{distance/1000:.1f} km from KYC"])
             
-            elements.append(Paragraph(detail_text, body_style))
+            detail_table = Table(rows, colWidths=[1.3*inch, 5*inch], hAlign='LEFT')
+            detail_table.setStyle(detail_style)
+            elements.append(detail_table)
             elements.append(Spacer(1, 0.2*inch))
     
     # ===================================
@@ -486,13 +643,10 @@ def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explan
             elements.append(Paragraph(summary_box, body_style))
             elements.append(Spacer(1, 0.3*inch))
         
-        # Detailed Analysis
+        # Detailed Analysis (heading and text in one paragraph, like the summary)
         if llm_explanation.get('detailed_analysis'):
-            elements.append(Paragraph("<b>Detailed Analysis:</b>", body_style))
-            elements.append(Spacer(1, 0.1*inch))
-            
             analysis_text = llm_explanation['detailed_analysis'].replace('\n', '<br/>')
-            elements.append(Paragraph(analysis_text, body_style))
+            elements.append(Paragraph(f"<b>Detailed Analysis:</b><br/><br/>{analysis_text}", body_style))
             elements.append(Spacer(1, 0.3*inch))
         
         # Risk Factors Table
@@ -512,17 +666,7 @@ def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explan
                 ])
             
             risk_table = Table(risk_table_data, colWidths=[1.5*inch, 1*inch, 3.5*inch])
-            risk_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8b5cf6')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F5F5F5')),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ]))
+            risk_table.setStyle(_RISK_TABLE_STYLE)
             
             elements.append(risk_table)
             elements.append(Spacer(1, 0.3*inch))
@@ -538,20 +682,19 @@ def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explan
             elif rec.get('action') in ["REVIEW", "STEP-UP"]:
                 rec_color = colors.orange.hexval()
 
-            recommendation_text = f"""
+            recommendation_parts = [f"""
             <para>
             <b>AI Recommendation:</b><br/>
             <font size=12 color={rec_color}><b>{rec.get('action', 'REVIEW REQUIRED')}</b></font><br/><br/>
-            """
+            """]
             
             if rec.get('next_steps'):
-                recommendation_text += "<b>Next Steps:</b><br/>"
-                for i, step in enumerate(rec['next_steps'], 1):
-                    recommendation_text += f"{i}. {step}<br/>"
+                recommendation_parts.append("<b>Next Steps:</b><br/>")
+                recommendation_parts.extend(f"{i}. {step}<br/>" for i, step in enumerate(rec['next_steps'], 1))
             
-            recommendation_text += "</para>"
+            recommendation_parts.append("</para>")
             
-            elements.append(Paragraph(recommendation_text, body_style))
+            elements.append(Paragraph(''.join(recommendation_parts), body_style))
             elements.append(Spacer(1, 0.3*inch))
         
         # AI Model Badge
@@ -559,7 +702,7 @@ def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explan
         <para align=center>
         <font size=8 color=gray>
         This analysis was generated by {llm_explanation.get('generation_method', 'AI').upper()}<br/>
-        Analysis Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        Analysis Date: {generated_at}
         </font>
         </para>
         """
@@ -586,5 +729,24 @@ def generate_investigation_report_with_llm(phone_number, logs, stats, llm_explan
     # Build PDF
     doc.build(elements)
     
+    if out_stream is not None:
+        return out_stream
+    
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
+
+
+def render_investigation_report_file(phone_number, logs, stats, llm_explanation=None):
+    """
+    Build the investigation PDF into a temp file and return its path
+    Top-level so it can run in a process pool worker; only the path goes back
+    to the caller, which streams the file and then deletes it.
+    """
+    pdf_file = tempfile.NamedTemporaryFile(prefix='fraud_investigation_', suffix='.pdf', delete=False)
+    try:
+        with pdf_file:
+            generate_investigation_report_with_llm(phone_number, logs, stats, llm_explanation, out_stream=pdf_file)
+    except Exception:
+        os.remove(pdf_file.name)
+        raise
+    return pdf_file.name
@@ -6,8 +6,10 @@ and distributes timestamps across 1–24 hours.
 """
 
 import requests
-import random
+from requests.adapters import HTTPAdapter
+import numpy as np
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import json
 
@@ -17,7 +19,8 @@ import json
 BASE_URL = "http://localhost:5000"
 PREDICT_ENDPOINT = f"{BASE_URL}/predict"
 TOTAL_TRANSACTIONS = 1000
-DELAY_BETWEEN_REQUESTS = 0.5  # seconds
+DELAY_BETWEEN_REQUESTS = 0  # seconds between submissions (0 = as fast as the pool sends)
+MAX_WORKERS = 16  # concurrent requests in flight
 
 # ======================================
 # COUNTRY & CUSTOMER CONFIG
@@ -96,53 +99,80 @@ TRANSACTION_SCENARIOS = {
 # FUNCTIONS
 # ======================================
 
-def select_country(is_fatf=False):
-    """Randomly select a customer country"""
-    if is_fatf:
-        return random.choice(FATF_HIGH_RISK_COUNTRIES)
-    return random.choice(LEGITIMATE_COUNTRIES)
-
-
-def generate_phone_number(country):
-    """Generate a realistic phone number using prefix by country"""
-    prefix = PHONE_PREFIXES.get(country, "+1-555")
-    suffix = f"{random.randint(1000,9999):04d}-{random.randint(1000,9999):04d}"
-    return f"{prefix}-{suffix}"
-
-
-def generate_amount(scenario):
-    """Generate transaction amount"""
-    min_amt, max_amt = scenario["amount_range"]
-    if scenario.get("round_amount"):
-        base_amounts = [500, 1000, 1500, 2000, 2500, 3000]
-        return float(random.choice(base_amounts))
-    return round(random.uniform(min_amt, max_amt), 2)
+ROUND_AMOUNTS = [500.0, 1000.0, 1500.0, 2000.0, 2500.0, 3000.0]
+
+# Countries with their phone prefixes as parallel arrays, so picking a country
+# index gathers both in one vectorized step
+_LEGIT_COUNTRIES = np.array(LEGITIMATE_COUNTRIES)
+_LEGIT_PREFIXES = np.array([PHONE_PREFIXES.get(c, "+1-555") for c in LEGITIMATE_COUNTRIES])
+_FATF_COUNTRIES = np.array(FATF_HIGH_RISK_COUNTRIES)
+_FATF_PREFIXES = np.array([PHONE_PREFIXES.get(c, "+1-555") for c in FATF_HIGH_RISK_COUNTRIES])
+
+
+def generate_transactions(count, rng=None):
+    """
+    Generate all test transactions in one vectorized pass
+    Returns a list of (scenario_name, is_fatf, payload) tuples
+    """
+    rng = rng or np.random.default_rng()
+    scenario_names = list(TRANSACTION_SCENARIOS)
+    scenarios = list(TRANSACTION_SCENARIOS.values())
+
+    # Weighted scenario per transaction
+    probs = np.array([s["probability"] for s in scenarios])
+    scenario_idx = rng.choice(len(scenarios), size=count, p=probs / probs.sum())
+
+    # FATF-origin scenarios, plus 15% random FATF origin
+    fatf_origin = np.array([s.get("fatf_origin", False) for s in scenarios])[scenario_idx]
+    is_fatf = fatf_origin | (rng.random(count) < 0.15)
+    legit_idx = rng.integers(len(_LEGIT_COUNTRIES), size=count)
+    fatf_idx = rng.integers(len(_FATF_COUNTRIES), size=count)
+    countries = np.where(is_fatf, _FATF_COUNTRIES[fatf_idx], _LEGIT_COUNTRIES[legit_idx])
+    prefixes = np.where(is_fatf, _FATF_PREFIXES[fatf_idx], _LEGIT_PREFIXES[legit_idx])
+    suffixes = rng.integers(1000, 10000, size=(count, 2))
+
+    # Uniform amount within the scenario range, or a round amount
+    amount_range = np.array([s["amount_range"] for s in scenarios], dtype=float)[scenario_idx]
+    amounts = np.round(rng.uniform(amount_range[:, 0], amount_range[:, 1]), 2)
+    is_round = np.array([s.get("round_amount", False) for s in scenarios])[scenario_idx]
+    amounts = np.where(is_round, rng.choice(ROUND_AMOUNTS, size=count), amounts)
+
+    # Timestamps spread across today (any hour, minute and second)
+    midnight = np.datetime64(datetime.now().date(), "s")
+    timestamps = np.datetime_as_string(midnight + rng.integers(0, 24 * 3600, size=count), unit="s")
+
+    transactions = []
+    for i in range(count):
+        country = str(countries[i])
+        payload = {
+            "phone_number": f"{prefixes[i]}-{suffixes[i, 0]}-{suffixes[i, 1]}",
+            "transaction_amount": float(amounts[i]),
+            "timestamp": timestamps[i].replace("T", " "),
+            "country": country
+        }
+        transactions.append((scenario_names[scenario_idx[i]], bool(is_fatf[i]), payload))
+    return transactions
 
 
-def generate_timestamp():
-    """Generate timestamps spread across the last 24 hours"""
-    now = datetime.now()
-    random_hour = random.randint(0, 23)
-    random_minute = random.randint(0, 59)
-    ts = now.replace(hour=random_hour, minute=random_minute, second=random.randint(0,59))
-    return ts.strftime("%Y-%m-%d %H:%M:%S")
+_session = None
 
 
-def select_scenario():
-    """Weighted random scenario"""
-    rand = random.random()
-    cumulative = 0
-    for name, scenario in TRANSACTION_SCENARIOS.items():
-        cumulative += scenario["probability"]
-        if rand <= cumulative:
-            return name, scenario
-    return "normal_low", TRANSACTION_SCENARIOS["normal_low"]
+def get_session():
+    """Shared keep-alive session so requests reuse pooled connections"""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _session = session
+    return _session
 
 
 def send_transaction(data):
     """Send transaction to Flask API"""
     try:
-        response = requests.post(PREDICT_ENDPOINT, data=data, timeout=10)
+        response = get_session().post(PREDICT_ENDPOINT, data=data, timeout=10)
         return response.status_code == 200
     except requests.exceptions.RequestException:
         return False
@@ -156,30 +186,29 @@ def main():
 
     stats = {"total": 0, "success": 0, "failed": 0, "fatf": 0, "legit": 0}
 
-    for i in range(TOTAL_TRANSACTIONS):
-        scenario_name, scenario = select_scenario()
-        is_fatf = scenario.get("fatf_origin", False) or random.random() < 0.15  # 15% random FATF origin
-
-        country = select_country(is_fatf)
-        phone = generate_phone_number(country)
-        amount = generate_amount(scenario)
-        timestamp = generate_timestamp()
+    transactions = generate_transactions(TOTAL_TRANSACTIONS)
 
-        payload = {
-            "phone_number": phone,
-            "transaction_amount": amount,
-            "timestamp": timestamp,
-            "country": country
-        }
+    # Send concurrently; results are printed in completion order
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {}
+        for i, (_, _, payload) in enumerate(transactions):
+            futures[executor.submit(send_transaction, payload)] = i
+            if DELAY_BETWEEN_REQUESTS:
+                time.sleep(DELAY_BETWEEN_REQUESTS)
 
-        success = send_transaction(payload)
-        stats["total"] += 1
-        stats["success" if success else "failed"] += 1
-        stats["fatf" if is_fatf else "legit"] += 1
+        for future in as_completed(futures):
+            i = futures[future]
+            scenario_name, is_fatf, payload = transactions[i]
+            country = payload["country"]
+            amount = payload["transaction_amount"]
+            timestamp = payload["timestamp"]
 
-        print(f"[{i+1:03}] {timestamp} | {country:12} | ${amount:8.2f} | {scenario_name:20} | {'OK' if success else 'FAILED'}")
+            success = future.result()
+            stats["total"] += 1
+            stats["success" if success else "failed"] += 1
+            stats["fatf" if is_fatf else "legit"] += 1
 
-        time.sleep(DELAY_BETWEEN_REQUESTS)
+            print(f"[{i+1:03}] {timestamp} | {country:12} | ${amount:8.2f} | {scenario_name:20} | {'OK' if success else 'FAILED'}")
 
     # Summary
     print("\n" + "=" * 70)
@@ -194,7 +223,7 @@ def main():
     # Save log
     filename = f"test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
     with open(filename, "w") as f:
-        json.dump(stats, f, indent=2)
+        f.write(json.dumps(stats, separators=(",", ":")))
     print(f"Results saved to: {filename}")
 
 
@@ -7,6 +7,7 @@ Usage:
     python safe_test_direct.py                    # Send 150 transactions (default)
     python safe_test_direct.py --count 200        # Send 200 transactions
     python safe_test_direct.py --count 50 --fast  # Send 50 quickly
+    python safe_test_direct.py --count 200 --async # Several requests in flight (needs httpx)
 
 Features:
 - Generates and sends in one go (like test_app.py)
@@ -17,10 +18,17 @@ Features:
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import random
 import time
 import argparse
-from datetime import datetime, timedelta
+import asyncio
+import bisect
+import itertools
+import re
+import sys
+from collections import Counter
+from contextlib import closing
 
 # ======================================
 # CONFIGURATION
@@ -28,6 +36,28 @@ from datetime import datetime, timedelta
 BASE_URL = "http://localhost:5000"
 PREDICT_ENDPOINT = f"{BASE_URL}/predict"
 
+# One keep-alive session for the whole run (no new TCP connection per transaction)
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# Optional: httpx drives the --async runner (HTTP/2 too when h2 is installed)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+# Requests kept in flight by the --async runner
+ASYNC_CONCURRENCY = 10
+
 # Safe countries (NOT on FATF high-risk lists)
 SAFE_COUNTRIES = [
     "India", "United States", "United Kingdom", "Singapore", 
@@ -60,6 +90,9 @@ PHONE_PREFIXES = {
     "Spain": "+34-6"
 }
 
+# (country, phone prefix) pairs so one random.choice picks both
+SAFE_COUNTRY_PREFIXES = tuple((country, PHONE_PREFIXES.get(country, "+1-555")) for country in SAFE_COUNTRIES)
+
 # Safe transaction scenarios
 SAFE_SCENARIOS = {
     "grocery_shopping": {
@@ -89,52 +122,78 @@ SAFE_SCENARIOS = {
     }
 }
 
+# Scenario names with their cumulative probabilities, for bisect lookups
+_SCENARIO_NAMES = tuple(SAFE_SCENARIOS)
+_SCENARIO_CDF = tuple(itertools.accumulate(SAFE_SCENARIOS[name]["probability"] for name in _SCENARIO_NAMES))
+
 # Safety thresholds
 MAX_RISK_SCORE = 40  # Auto-stop if risk score exceeds this
 ALLOWED_RISK_LEVELS = ["Low Risk"]
 
+# Fraud alert keywords (lowercased) -> stop reason
+FRAUD_KEYWORDS = {
+    "sim swap detected": "SIM swap alert",
+    "sim_swap": "SIM swap detected",
+    "location mismatch": "Location mismatch",
+    "location_suspicious": "Location suspicious",
+    "device offline": "Device offline",
+    "not_connected": "Device not connected",
+    "roaming": "Roaming detected",
+    "fatf": "FATF country",
+    "blocked": "Transaction blocked",
+    "reject": "Transaction rejected"
+}
+
+# Every alert (lowercased match) -> stop reason
+_ALERT_REASONS = {"high risk": "High Risk detected", "high-risk": "High Risk detected", **FRAUD_KEYWORDS}
+
+# Compiled once: "High Risk" (exact case), "high-risk" and the fraud keywords
+# (any case) in one alternation, so the HTML is scanned once with no lowercased copy
+_ALERT_RE = re.compile("High Risk|(?i:" + "|".join(map(re.escape, ["high-risk", *FRAUD_KEYWORDS])) + ")")
+_PCT_RE = re.compile(r'(\d+\.?\d*)%')
+
+# Characters carried between streamed chunks so an alert split across a boundary still matches
+_ALERT_OVERLAP = max(map(len, _ALERT_REASONS)) - 1
+
 # ======================================
 # GENERATOR FUNCTIONS
 # ======================================
 
-def generate_phone_number(country):
-    """Generate realistic phone number"""
-    prefix = PHONE_PREFIXES.get(country, "+1-555")
+def generate_phone_number(prefix):
+    """Generate realistic phone number with the country's prefix"""
     suffix = f"{random.randint(10000, 99999)}{random.randint(1000, 9999)}"
     return f"{prefix}{suffix}"
 
 
-def generate_timestamp():
-    """Generate timestamps spread across 24 hours"""
-    now = datetime.now()
-    hours_ago = random.randint(0, 23)
-    minutes_ago = random.randint(0, 59)
-    timestamp = now - timedelta(hours=hours_ago, minutes=minutes_ago)
-    return timestamp.strftime("%Y-%m-%d %H:%M:%S")
+def generate_timestamp(base_time=None):
+    """Generate timestamps spread across the 24 hours before base_time (epoch seconds)"""
+    if base_time is None:
+        base_time = time.time()
+    seconds_ago = random.randint(0, 23) * 3600 + random.randint(0, 59) * 60
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(base_time - seconds_ago))
 
 
 def select_scenario():
     """Weighted random selection of safe scenarios"""
-    rand = random.random()
-    cumulative = 0
-    for name, scenario in SAFE_SCENARIOS.items():
-        cumulative += scenario["probability"]
-        if rand <= cumulative:
-            return name, scenario
-    return "grocery_shopping", SAFE_SCENARIOS["grocery_shopping"]
-
-
-def generate_safe_transaction():
-    """Generate a single safe transaction"""
-    country = random.choice(SAFE_COUNTRIES)
+    i = bisect.bisect_left(_SCENARIO_CDF, random.random())
+    if i == len(_SCENARIO_NAMES):
+        # Probabilities summed just short of 1.0
+        return "grocery_shopping", SAFE_SCENARIOS["grocery_shopping"]
+    name = _SCENARIO_NAMES[i]
+    return name, SAFE_SCENARIOS[name]
+
+
+def generate_safe_transaction(base_time=None):
+    """Generate a single safe transaction (timestamp relative to base_time)"""
+    country, prefix = random.choice(SAFE_COUNTRY_PREFIXES)
     city = random.choice(SAFE_CITIES[country])
-    phone = generate_phone_number(country)
+    phone = generate_phone_number(prefix)
     
     scenario_name, scenario = select_scenario()
     min_amt, max_amt = scenario["amount_range"]
     amount = round(random.uniform(min_amt, max_amt), 2)
     
-    timestamp = generate_timestamp()
+    timestamp = generate_timestamp(base_time)
     
     return {
         "phone_number": phone,
@@ -158,10 +217,12 @@ def send_transaction(phone_number, amount):
     }
     
     try:
-        response = requests.post(
+        # Streamed: check_for_fraud_alerts reads the body and stops at the first alert
+        response = SESSION.post(
             PREDICT_ENDPOINT,
             data=payload,
-            timeout=10
+            timeout=10,
+            stream=True
         )
         return response.status_code == 200, response
     except requests.exceptions.RequestException as e:
@@ -170,42 +231,39 @@ def send_transaction(phone_number, amount):
 
 def check_for_fraud_alerts(response):
     """
-    Check if response contains any fraud alerts
+    Check if a streamed response contains any fraud alerts
+    Reads the body chunk by chunk and closes the response once decided.
+    Returns: (is_safe, alert_reason)
+    """
+    with closing(response):
+        if response.encoding is None:
+            response.encoding = 'utf-8'
+        return scan_for_fraud_alerts(response.iter_content(chunk_size=8192, decode_unicode=True))
+
+
+def scan_for_fraud_alerts(chunks):
+    """
+    Check HTML (an iterable of text chunks) for fraud alerts
+    Stops consuming chunks at the first alert keyword.
     Returns: (is_safe, alert_reason)
     """
     try:
-        html = response.text
-        
-        # Check for High Risk
-        if "High Risk" in html or "high-risk" in html.lower():
-            return False, "High Risk detected"
-        
-        # Check for fraud alert keywords
-        fraud_keywords = {
-            "SIM Swap Detected": "SIM swap alert",
-            "sim_swap": "SIM swap detected",
-            "Location Mismatch": "Location mismatch",
-            "location_suspicious": "Location suspicious",
-            "Device Offline": "Device offline",
-            "NOT_CONNECTED": "Device not connected",
-            "Roaming": "Roaming detected",
-            "FATF": "FATF country",
-            "Blocked": "Transaction blocked",
-            "REJECT": "Transaction rejected"
-        }
-        
-        html_lower = html.lower()
-        for keyword, reason in fraud_keywords.items():
-            if keyword.lower() in html_lower:
-                return False, reason
+        seen = []
+        tail = ""
+        for chunk in chunks:
+            # Check for High Risk and fraud alert keywords in one scan
+            text = tail + chunk
+            match = _ALERT_RE.search(text)
+            if match:
+                return False, _ALERT_REASONS[match.group(0).lower()]
+            seen.append(chunk)
+            tail = text[-_ALERT_OVERLAP:]
         
-        # Check for high risk scores
-        import re
-        percentages = re.findall(r'(\d+\.?\d*)%', html)
-        if percentages:
-            max_score = max(float(p) for p in percentages)
-            if max_score > MAX_RISK_SCORE:
-                return False, f"Risk score too high: {max_score}%"
+        # Check for high risk scores (stop at the first one over the limit)
+        for match in _PCT_RE.finditer("".join(seen)):
+            score = float(match.group(1))
+            if score > MAX_RISK_SCORE:
+                return False, f"Risk score too high: {score}%"
         
         return True, None
         
@@ -217,14 +275,15 @@ def check_for_fraud_alerts(response):
 # MAIN TEST RUNNER
 # ======================================
 
-def run_safe_test(total_count=150, delay=0.3, show_details=True):
+def run_safe_test(total_count=150, delay=0.3, show_details=True, top=None):
     """
     Main test runner - generates and sends transactions
     
     Args:
         total_count: Number of transactions to send
-        delay: Seconds between requests
+        delay: Minimum seconds between request starts (request time counts towards it)
         show_details: Show detailed output for each transaction
+        top: Only list the top N countries/scenarios in the summary (None = all)
     """
     
     print("=" * 90)
@@ -245,8 +304,8 @@ def run_safe_test(total_count=150, delay=0.3, show_details=True):
         "stopped": False,
         "stop_reason": None,
         "total_amount": 0,
-        "countries": {},
-        "scenarios": {}
+        "countries": Counter(),
+        "scenarios": Counter()
     }
     
     start_time = time.time()
@@ -255,14 +314,15 @@ def run_safe_test(total_count=150, delay=0.3, show_details=True):
         stats["total"] = i
         
         # Generate safe transaction
-        txn = generate_safe_transaction()
+        txn = generate_safe_transaction(start_time)
         
         # Track statistics
-        stats["countries"][txn["country"]] = stats["countries"].get(txn["country"], 0) + 1
-        stats["scenarios"][txn["scenario"]] = stats["scenarios"].get(txn["scenario"], 0) + 1
+        stats["countries"][txn["country"]] += 1
+        stats["scenarios"][txn["scenario"]] += 1
         stats["total_amount"] += txn["amount"]
         
         # Send transaction
+        request_start = time.perf_counter()
         success, response_or_error = send_transaction(txn["phone_number"], txn["amount"])
         
         if not success:
@@ -279,33 +339,152 @@ def run_safe_test(total_count=150, delay=0.3, show_details=True):
             # STOP IMMEDIATELY
             stats["stopped"] = True
             stats["stop_reason"] = alert_reason
-            print()
-            print("=" * 90)
-            print(f"🚨 SAFETY STOP TRIGGERED!")
-            print(f"Reason: {alert_reason}")
-            print(f"Transaction #{i}: {txn['phone_number']} - ${txn['amount']:.2f}")
-            print(f"Country: {txn['country']} | Scenario: {txn['scenario']}")
-            print("=" * 90)
+            print_safety_stop(i, txn, alert_reason)
             break
         
         stats["success"] += 1
         
         # Display progress
-        if show_details:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            print(f"[{i:03d}] {timestamp} | {txn['country']:12} | ${txn['amount']:8.2f} | {txn['scenario']:20} | ✅ OK")
-        else:
-            # Show progress bar for fast mode
-            if i % 10 == 0:
-                progress = (i / total_count) * 100
-                print(f"Progress: {i}/{total_count} ({progress:.1f}%) - All safe ✅")
+        print_progress(i, total_count, txn, show_details)
         
-        # Delay before next request
-        time.sleep(delay)
+        # Delay before next request - only what the request itself didn't already take
+        time.sleep(max(0.0, delay - (time.perf_counter() - request_start)))
     
     elapsed_time = time.time() - start_time
+    print_test_summary(stats, elapsed_time, top)
     
-    # Print final summary
+    return stats
+
+
+async def run_safe_test_async(total_count=150, delay=0.3, show_details=True, concurrency=ASYNC_CONCURRENCY, top=None):
+    """
+    Async test runner - keeps up to `concurrency` requests in flight
+    
+    Same safety-stop semantics as run_safe_test: responses are checked as
+    they complete and every pending request is cancelled on the first alert.
+    Each in-flight slot is held until `delay` seconds after its request started.
+    
+    Args:
+        total_count: Number of transactions to send
+        delay: Minimum seconds between request starts on each slot
+        show_details: Show detailed output for each transaction
+        concurrency: Maximum number of requests in flight
+        top: Only list the top N countries/scenarios in the summary (None = all)
+    """
+    
+    print("=" * 90)
+    print(f"🛡️  FraudGuard AI - Safe Direct Tester (async)")
+    print("=" * 90)
+    print(f"📊 Transactions to send: {total_count}")
+    print(f"🎯 Target endpoint: {PREDICT_ENDPOINT}")
+    print(f"⏱️  Delay between requests: {delay}s")
+    print(f"🔀 Requests in flight: {concurrency}")
+    print(f"🛡️  Safety mode: ENABLED (auto-stop on alerts)")
+    print("=" * 90)
+    print()
+    
+    # Statistics
+    stats = {
+        "total": 0,
+        "success": 0,
+        "failed": 0,
+        "stopped": False,
+        "stop_reason": None,
+        "total_amount": 0,
+        "countries": Counter(),
+        "scenarios": Counter()
+    }
+    
+    start_time = time.time()
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+    
+    async with httpx.AsyncClient(limits=limits, http2=H2_AVAILABLE, timeout=10.0) as client:
+        
+        async def send(txn):
+            async with semaphore:
+                request_start = time.perf_counter()
+                try:
+                    response = await client.post(
+                        PREDICT_ENDPOINT,
+                        data={"phone_number": txn["phone_number"], "transaction_amount": txn["amount"]}
+                    )
+                except httpx.HTTPError as e:
+                    return txn, False, str(e)
+                # Hold the slot until `delay` after the request started so the rate stays capped
+                await asyncio.sleep(max(0.0, delay - (time.perf_counter() - request_start)))
+                return txn, response.status_code == 200, response
+        
+        tasks = [asyncio.create_task(send(generate_safe_transaction(start_time))) for _ in range(total_count)]
+        
+        try:
+            for i, next_done in enumerate(asyncio.as_completed(tasks), 1):
+                txn, success, response_or_error = await next_done
+                stats["total"] = i
+                
+                # Track statistics
+                stats["countries"][txn["country"]] += 1
+                stats["scenarios"][txn["scenario"]] += 1
+                stats["total_amount"] += txn["amount"]
+                
+                if not success:
+                    stats["failed"] += 1
+                    print(f"[{i:03d}] ❌ FAILED - Connection error")
+                    stats["stopped"] = True
+                    stats["stop_reason"] = f"Connection error: {response_or_error}"
+                    break
+                
+                # Check for fraud alerts
+                is_safe, alert_reason = scan_for_fraud_alerts((response_or_error.text,))
+                
+                if not is_safe:
+                    # STOP IMMEDIATELY (pending requests are cancelled below)
+                    stats["stopped"] = True
+                    stats["stop_reason"] = alert_reason
+                    print_safety_stop(i, txn, alert_reason)
+                    break
+                
+                stats["success"] += 1
+                print_progress(i, total_count, txn, show_details)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    elapsed_time = time.time() - start_time
+    print_test_summary(stats, elapsed_time, top)
+    
+    return stats
+
+
+def print_safety_stop(i, txn, alert_reason):
+    """Print the safety stop banner for transaction #i"""
+    print()
+    print("=" * 90)
+    print(f"🚨 SAFETY STOP TRIGGERED!")
+    print(f"Reason: {alert_reason}")
+    print(f"Transaction #{i}: {txn['phone_number']} - ${txn['amount']:.2f}")
+    print(f"Country: {txn['country']} | Scenario: {txn['scenario']}")
+    print("=" * 90)
+
+
+def print_progress(i, total_count, txn, show_details):
+    """Display progress for a transaction that came back safe"""
+    if show_details:
+        # One write per line, flushed every 10 (the summary still uses print)
+        timestamp = time.strftime("%H:%M:%S")
+        sys.stdout.write(f"[{i:03d}] {timestamp} | {txn['country']:12} | ${txn['amount']:8.2f} | {txn['scenario']:20} | ✅ OK\n")
+        if i % 10 == 0:
+            sys.stdout.flush()
+    else:
+        # Show progress bar for fast mode
+        if i % 10 == 0:
+            progress = (i / total_count) * 100
+            print(f"Progress: {i}/{total_count} ({progress:.1f}%) - All safe ✅")
+
+
+def print_test_summary(stats, elapsed_time, top=None):
+    """Print the final summary of a test run (top: how many countries/scenarios to list)"""
     print()
     print("=" * 90)
     print("📊 Test Summary")
@@ -332,19 +511,17 @@ def run_safe_test(total_count=150, delay=0.3, show_details=True):
     
     print()
     print("Country Distribution:")
-    for country, count in sorted(stats["countries"].items(), key=lambda x: x[1], reverse=True):
+    for country, count in stats["countries"].most_common(top):
         percentage = (count / stats["success"]) * 100 if stats["success"] > 0 else 0
         print(f"  {country:20} {count:3} ({percentage:.1f}%)")
     
     print()
     print("Scenario Distribution:")
-    for scenario, count in sorted(stats["scenarios"].items(), key=lambda x: x[1], reverse=True):
+    for scenario, count in stats["scenarios"].most_common(top):
         percentage = (count / stats["success"]) * 100 if stats["success"] > 0 else 0
         print(f"  {scenario:20} {count:3} ({percentage:.1f}%)")
     
     print("=" * 90)
-    
-    return stats
 
 
 # ======================================
@@ -361,6 +538,7 @@ Examples:
   python safe_test_direct.py --count 200        # Send 200 transactions
   python safe_test_direct.py --count 50 --fast  # Send 50 quickly (0.1s delay)
   python safe_test_direct.py --quiet            # Minimal output
+  python safe_test_direct.py --count 200 --async # Several requests in flight
 
 Safety Features:
   ✓ Only safe, low-risk transactions
@@ -397,6 +575,20 @@ Safety Features:
         help='Quiet mode: show summary only'
     )
     
+    parser.add_argument(
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help=f'Async mode: keep up to {ASYNC_CONCURRENCY} requests in flight (requires httpx)'
+    )
+    
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=None,
+        help='Only list the top N countries/scenarios in the summary (default: all)'
+    )
+    
     parser.add_argument(
         '--url',
         type=str,
@@ -423,6 +615,10 @@ Safety Features:
     if args.delay < 0.05:
         print("⚠️  Warning: Very low delay may cause connection issues")
     
+    if args.use_async and not HTTPX_AVAILABLE:
+        print("❌ Error: --async requires httpx (pip install httpx)")
+        return
+    
     # Confirm before sending
     print(f"\n🛡️  Ready to send {args.count} safe transactions")
     print(f"Target: {PREDICT_ENDPOINT}")
@@ -435,7 +631,10 @@ Safety Features:
     
     # Run test
     show_details = not args.quiet
-    stats = run_safe_test(args.count, args.delay, show_details)
+    if args.use_async:
+        stats = asyncio.run(run_safe_test_async(args.count, args.delay, show_details, top=args.top))
+    else:
+        stats = run_safe_test(args.count, args.delay, show_details, top=args.top)
     
     # Exit with appropriate code
     if stats["stopped"]:
@@ -1,5 +1,6 @@
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 test_phone = "+99999991000"
 
@@ -11,41 +12,38 @@ headers = {
 
 base_url = "https://network-as-code.p-eu.rapidapi.com"
 
+# One session for all four calls: auth headers set once, connections pooled
+session = requests.Session()
+session.headers.update(headers)
+
 print("=" * 60)
 print("✅ FINAL NOKIA CAMARA API TEST (RapidAPI Verified Nov 2025)")
 print("=" * 60)
 
-# 1. SIM Swap (requires passthrough)
-print("\n1️⃣ SIM Swap Check")
-url = f"{base_url}/passthrough/camara/v1/sim-swap/sim-swap/v0/check"
-payload = { "phoneNumber": test_phone, "maxAge": 240 }
-r = requests.post(url, json=payload, headers=headers, timeout=10)
-print(f"   Status: {r.status_code}")
-print(f"   Response: {r.text[:200]}")
-
-# 2. Location Retrieval (direct)
-print("\n2️⃣ Location Retrieval")
-url = f"{base_url}/location-retrieval/v0/retrieve"
-payload = { "device": { "phoneNumber": test_phone }, "maxAge": 60 }
-print(url)
-r = requests.post(url, json=payload, headers=headers, timeout=10)
-print(f"   Status: {r.status_code}")
-print(f"   Response: {r.text[:200]}")
-
-# 3. Device Roaming (direct)
-print("\n3️⃣ Device Roaming Status")
-url = f"{base_url}/device-status/v0/roaming"
-payload = { "device": { "phoneNumber": test_phone } }
-r = requests.post(url, json=payload, headers=headers, timeout=10)
-print(f"   Status: {r.status_code}")
-print(f"   Response: {r.text[:200]}")
-
-# 4. Device Connectivity (direct)
-print("\n4️⃣ Device Connectivity Status")
-url = f"{base_url}/device-status/v0/connectivity"
-payload = { "device": { "phoneNumber": test_phone } }
-r = requests.post(url, json=payload, headers=headers, timeout=10)
-print(f"   Status: {r.status_code}")
-print(f"   Response: {r.text[:200]}")
+probes = [
+    # 1. SIM Swap (requires passthrough)
+    ("1️⃣ SIM Swap Check", f"{base_url}/passthrough/camara/v1/sim-swap/sim-swap/v0/check",
+     { "phoneNumber": test_phone, "maxAge": 240 }),
+    # 2. Location Retrieval (direct)
+    ("2️⃣ Location Retrieval", f"{base_url}/location-retrieval/v0/retrieve",
+     { "device": { "phoneNumber": test_phone }, "maxAge": 60 }),
+    # 3. Device Roaming (direct)
+    ("3️⃣ Device Roaming Status", f"{base_url}/device-status/v0/roaming",
+     { "device": { "phoneNumber": test_phone } }),
+    # 4. Device Connectivity (direct)
+    ("4️⃣ Device Connectivity Status", f"{base_url}/device-status/v0/connectivity",
+     { "device": { "phoneNumber": test_phone } }),
+]
+
+# The probes are independent: send all four at once, then print them in order
+with ThreadPoolExecutor(max_workers=len(probes)) as executor:
+    futures = [executor.submit(session.post, url, json=payload, timeout=10) for _, url, payload in probes]
+
+    for (label, url, _), future in zip(probes, futures):
+        r = future.result()
+        print(f"\n{label}")
+        print(url)
+        print(f"   Status: {r.status_code}")
+        print(f"   Response: {r.text[:200]}")
 
 print("\n" + "=" * 60)
@@ -1,27 +1,77 @@
 # utilities_functions.py - UPDATED to save all score types
 import json
 import os
+import threading
 import numpy as np
+from functools import lru_cache
+from itertools import islice
 from datetime import datetime
 from collections import defaultdict
 
-LOGS_FILE = 'transaction_logs.json'
+# Append-only log: one JSON object per line, oldest first
+LOGS_FILE = 'transaction_logs.jsonl'
+# Old format: one JSON array, newest first (migrated into LOGS_FILE on first use)
+LEGACY_LOGS_FILE = 'transaction_logs.json'
+# Running counters for get_statistics, updated as each log is appended
+STATS_FILE = 'transaction_stats.json'
+STATS_KEYS = (
+    'total_transactions', 'high_risk_count', 'medium_risk_count', 'low_risk_count',
+    'sim_swap_detections', 'location_mismatches', 'roaming_detections', 'device_not_connected'
+)
 FEEDBACK_FILE = 'feedback_logs.json'
 
+# Optional: flock keeps appends from several server processes from interleaving
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
 
-def convert_to_serializable(obj):
-    """Convert NumPy types to Python native types for JSON serialization"""
+# Optional: orjson writes and parses log lines faster (falls back to json)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Guards appends, the stats counters and the one-time migration within this process
+# (reentrant: rebuild_stats reads the logs while holding it)
+_logs_lock = threading.RLock()
+_logs_migrated = False
+
+
+def _json_default(obj):
+    """
+    json.dumps default= hook: convert NumPy types to Python native types
+    Only called for values the encoder can't handle itself; anything else is stringified.
+    """
     if isinstance(obj, np.integer):
         return int(obj)
     elif isinstance(obj, np.floating):
         return float(obj)
+    elif isinstance(obj, np.bool_):
+        return bool(obj)
     elif isinstance(obj, np.ndarray):
         return obj.tolist()
-    elif isinstance(obj, dict):
-        return {key: convert_to_serializable(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_to_serializable(item) for item in obj]
-    return obj
+    return str(obj)
+
+
+def _dump_log_line(log):
+    """
+    Serialize one log entry as a JSONL line (bytes)
+    orjson handles NumPy values natively; _json_default covers everything else.
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(
+                log,
+                default=_json_default,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which only the stdlib encoder writes
+            pass
+    return (json.dumps(log, default=_json_default) + '\n').encode()
 
 
 def log_transaction(phone_number, transaction_amount, fraud_probability, risk_level, explanation, transaction_data, camara_data, scoring_breakdown=None,merchant_name=None, payment_method=None):
@@ -31,27 +81,19 @@ def log_transaction(phone_number, transaction_amount, fraud_probability, risk_le
     NEW: Now saves ml_score, weighted_score, condition_score, and final_score separately
     """
     
-    # Convert all NumPy types to native Python types
-    transaction_data = convert_to_serializable(transaction_data)
-    camara_data = convert_to_serializable(camara_data)
-    
     # Extract location from CAMARA data
     camara_location = camara_data.get('location', {})
     current_city = camara_location.get('current_city', transaction_data.get('kyc_city', 'N/A'))
     current_country = camara_location.get('current_country', transaction_data.get('kyc_country', 'N/A'))
     
     # NEW: Extract individual scores from scoring_breakdown
-    if scoring_breakdown:
-        model_score = scoring_breakdown.get('model_score', fraud_probability * 100)
-        weighted_score = scoring_breakdown.get('weighted_score', fraud_probability * 100)
-        condition_score = scoring_breakdown.get('condition_score', 0)
-        final_score = scoring_breakdown.get('final_score', fraud_probability * 100)
-    else:
-        # Fallback for backward compatibility
-        model_score = fraud_probability * 100
-        weighted_score = fraud_probability * 100
-        condition_score = 0
-        final_score = fraud_probability * 100
+    # (missing scores fall back to the fraud probability, for backward compatibility)
+    probability_score = fraud_probability * 100
+    breakdown = scoring_breakdown or {}
+    model_score = breakdown.get('model_score', probability_score)
+    weighted_score = breakdown.get('weighted_score', probability_score)
+    condition_score = breakdown.get('condition_score', 0)
+    final_score = breakdown.get('final_score', probability_score)
     
     log_entry = {
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -105,20 +147,18 @@ def log_transaction(phone_number, transaction_amount, fraud_probability, risk_le
     }
     
     try:
-        if os.path.exists(LOGS_FILE):
-            with open(LOGS_FILE, 'r') as f:
-                try:
-                    logs = json.load(f)
-                except json.JSONDecodeError:
-                    print("⚠️ Corrupted logs file detected. Creating new logs file.")
-                    logs = []
-        else:
-            logs = []
-        
-        logs.insert(0, log_entry)
+        migrate_legacy_logs()
+        line = _dump_log_line(log_entry)
         
-        with open(LOGS_FILE, 'w') as f:
-            json.dump(logs, f, indent=2, default=str)
+        # Append one line - no need to read or rewrite the existing logs
+        with _logs_lock, open(LOGS_FILE, 'ab') as f:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            size_before = os.fstat(f.fileno()).st_size
+            f.write(line)
+            f.flush()
+            # Still under the lock, so counters and log stay in step
+            _update_stats(log_entry, size_before, os.fstat(f.fileno()).st_size)
         
         print(f"✅ Transaction logged: {phone_number} from {current_city}, {current_country}")
         print(f"   📊 Scores: ML={model_score:.1f}% | Weighted={weighted_score:.1f}% | Rules={condition_score:.1f}% | Final={final_score:.1f}%")
@@ -128,78 +168,201 @@ def log_transaction(phone_number, transaction_amount, fraud_probability, risk_le
         traceback.print_exc()
 
 
+def migrate_legacy_logs():
+    """One-time copy of the legacy JSON array logs into the JSONL log (oldest first)"""
+    global _logs_migrated
+    if _logs_migrated:
+        return
+    
+    with _logs_lock:
+        if _logs_migrated:
+            return
+        if os.path.exists(LEGACY_LOGS_FILE) and not os.path.exists(LOGS_FILE):
+            try:
+                with open(LEGACY_LOGS_FILE, 'r') as f:
+                    legacy_logs = json.load(f)
+                
+                # Write to a temp file first so a crash never leaves a half-migrated log
+                tmp_file = LOGS_FILE + '.tmp'
+                with open(tmp_file, 'wb') as f:
+                    for log in reversed(legacy_logs):
+                        f.write(_dump_log_line(log))
+                os.replace(tmp_file, LOGS_FILE)
+                print(f"✅ Migrated {len(legacy_logs)} logs from {LEGACY_LOGS_FILE} to {LOGS_FILE}")
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Could not migrate {LEGACY_LOGS_FILE}: {e}")
+        _logs_migrated = True
+
+
+def _parse_log_line(line):
+    """Decode one JSONL log line (with orjson when installed)"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            # e.g. NaN values, which only the stdlib parser accepts
+            pass
+    return json.loads(line)
+
+
+def iter_transaction_logs():
+    """
+    Yield transaction logs one at a time, oldest first, skipping corrupted lines
+    Only one parsed log is held at a time - use this when a pass over the logs is enough.
+    """
+    migrate_legacy_logs()
+    if not os.path.exists(LOGS_FILE):
+        return
+    
+    corrupted_lines = 0
+    with open(LOGS_FILE, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield _parse_log_line(line)
+            except json.JSONDecodeError:
+                # e.g. a line cut short by a crash mid-append - skip just that entry
+                corrupted_lines += 1
+    
+    if corrupted_lines:
+        print(f"⚠️ Skipped {corrupted_lines} corrupted line(s) in {LOGS_FILE}")
+
+
 def get_transaction_logs():
-    """Get all transaction logs with error handling"""
+    """Get all transaction logs (newest first) with error handling"""
     try:
-        if os.path.exists(LOGS_FILE):
-            with open(LOGS_FILE, 'r') as f:
-                return json.load(f)
-        return []
-    except json.JSONDecodeError as e:
-        print(f"Error loading logs: {e}")
-        print("⚠️ Logs file is corrupted. Backing up and creating new file.")
-        
-        # Backup corrupted file
-        if os.path.exists(LOGS_FILE):
-            backup_name = f'transaction_logs_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-            try:
-                os.rename(LOGS_FILE, backup_name)
-                print(f"✅ Corrupted file backed up as: {backup_name}")
-            except:
-                pass
-        
-        return []
+        logs = list(iter_transaction_logs())
+        logs.reverse()
+        return logs
     except Exception as e:
         print(f"Error loading logs: {e}")
         return []
 
 
-def get_statistics():
-    """Calculate statistics from logs"""
-    logs = get_transaction_logs()
+def get_customer_history(logs, phone_number):
+    """
+    Split logs (newest first) into the latest transaction for a phone and its full history
     
-    if not logs:
-        return {
-            'total_transactions': 0,
-            'high_risk_count': 0,
-            'sim_swap_detections': 0,
-            'location_mismatches': 0,
-            'roaming_detections': 0,
-            'device_not_connected': 0
-        }
+    Returns (None, []) when the phone has no transactions, without building any list.
+    """
+    for idx, log in enumerate(logs):
+        if log['phone_number'] == phone_number:
+            # Everything before idx is already known not to match - resume the scan after it
+            history = [log]
+            history.extend(l for l in islice(logs, idx + 1, None) if l['phone_number'] == phone_number)
+            return log, history
+    return None, []
+
+
+def _count_log(stats, log):
+    """Add one log entry to the statistics counters"""
+    stats['total_transactions'] += 1
     
-    stats = {
-        'total_transactions': len(logs),
-        'high_risk_count': sum(1 for log in logs if log.get('risk_level') == 'High Risk'),
-        'medium_risk_count': sum(1 for log in logs if log.get('risk_level') == 'Medium Risk'),
-        'low_risk_count': sum(1 for log in logs if log.get('risk_level') == 'Low Risk'),
-        'sim_swap_detections': sum(1 for log in logs if log.get('camara_data', {}).get('sim_swap', {}).get('swapped', False)),
-        'location_mismatches': sum(1 for log in logs if not log.get('camara_data', {}).get('location', {}).get('verified', True)),
-        'roaming_detections': sum(1 for log in logs if log.get('camara_data', {}).get('roaming', {}).get('roaming', False)),
-        'device_not_connected': sum(1 for log in logs if log.get('camara_data', {}).get('device_status', {}).get('connection_status') == 'NOT_CONNECTED')
-    }
+    risk_level = log.get('risk_level')
+    if risk_level == 'High Risk':
+        stats['high_risk_count'] += 1
+    elif risk_level == 'Medium Risk':
+        stats['medium_risk_count'] += 1
+    elif risk_level == 'Low Risk':
+        stats['low_risk_count'] += 1
     
+    camara_data = log.get('camara_data', {})
+    if camara_data.get('sim_swap', {}).get('swapped', False):
+        stats['sim_swap_detections'] += 1
+    if not camara_data.get('location', {}).get('verified', True):
+        stats['location_mismatches'] += 1
+    if camara_data.get('roaming', {}).get('roaming', False):
+        stats['roaming_detections'] += 1
+    if camara_data.get('device_status', {}).get('connection_status') == 'NOT_CONNECTED':
+        stats['device_not_connected'] += 1
+
+
+def _read_stats():
+    """Return (stats, log_size) from STATS_FILE, or (None, None) if missing or unreadable"""
+    try:
+        with open(STATS_FILE, 'r') as f:
+            saved = json.load(f)
+        return saved['stats'], saved['log_size']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, None
+
+
+def _write_stats(stats, log_size):
+    """Save the counters with the log size they cover (temp file + rename, never half-written)"""
+    tmp_file = STATS_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({'log_size': log_size, 'stats': stats}, f)
+    os.replace(tmp_file, STATS_FILE)
+
+
+def _update_stats(log_entry, size_before, size_after):
+    """Count a just-appended log into STATS_FILE (caller holds _logs_lock)"""
+    stats, log_size = _read_stats()
+    if stats is None or log_size != size_before:
+        # Missing or out of step with the log - recount (includes the new entry)
+        rebuild_stats()
+        return
+    _count_log(stats, log_entry)
+    _write_stats(stats, size_after)
+
+
+def _logs_size():
+    """Size of the JSONL log in bytes (0 if there is none yet)"""
+    return os.path.getsize(LOGS_FILE) if os.path.exists(LOGS_FILE) else 0
+
+
+def get_statistics():
+    """
+    Get statistics from the running counters
+    Recounted from the logs only if the counters are missing or don't match the log file.
+    """
+    migrate_legacy_logs()
+    stats, log_size = _read_stats()
+    if stats is None or log_size != _logs_size():
+        return rebuild_stats()
+    return stats
+
+
+def rebuild_stats():
+    """Recount the statistics from all logs and save them to STATS_FILE"""
+    with _logs_lock:
+        # Streams the log once - no list of all logs is built
+        stats = _calculate_statistics(iter_transaction_logs())
+        _write_stats(stats, _logs_size())
     return stats
 
 
+def _calculate_statistics(logs):
+    """Calculate statistics from logs (any iterable) in a single pass"""
+    stats = dict.fromkeys(STATS_KEYS, 0)
+    for log in logs:
+        _count_log(stats, log)
+    
+    return stats
+
+
+# FATF lists (updated as of 2024)
+FATF_HIGH_RISK = frozenset({
+    'Iran', 'North Korea', 'Myanmar', 'Democratic People\'s Republic of Korea'
+})
+
+FATF_WATCHLIST = frozenset({
+    'Pakistan', 'Afghanistan', 'Albania', 'Barbados', 'Burkina Faso',
+    'Cameroon', 'Croatia', 'Democratic Republic of the Congo', 'Gibraltar',
+    'Haiti', 'Jamaica', 'Jordan', 'Mali', 'Mozambique', 'Nigeria',
+    'Panama', 'Philippines', 'Senegal', 'South Africa', 'South Sudan',
+    'Syria', 'Tanzania', 'Turkey', 'Uganda', 'United Arab Emirates',
+    'Vietnam', 'Yemen'
+})
+
+
+@lru_cache(maxsize=512)
 def check_fatf_country(country):
     """
     Check if country is in FATF high-risk or watch list
-    Updated as of 2024
+    Cached per country - the returned dict is shared, so don't mutate it
     """
-    FATF_HIGH_RISK = [
-        'Iran', 'North Korea', 'Myanmar', 'Democratic People\'s Republic of Korea'
-    ]
-    
-    FATF_WATCHLIST = [
-        'Pakistan', 'Afghanistan', 'Albania', 'Barbados', 'Burkina Faso',
-        'Cameroon', 'Croatia', 'Democratic Republic of the Congo', 'Gibraltar',
-        'Haiti', 'Jamaica', 'Jordan', 'Mali', 'Mozambique', 'Nigeria',
-        'Panama', 'Philippines', 'Senegal', 'South Africa', 'South Sudan',
-        'Syria', 'Tanzania', 'Turkey', 'Uganda', 'United Arab Emirates',
-        'Vietnam', 'Yemen'
-    ]
-    
     is_high_risk = country in FATF_HIGH_RISK
     is_watchlist = country in FATF_WATCHLIST
     
@@ -214,6 +377,24 @@ def check_fatf_country(country):
     }
 
 
+# Summary per decision for generate_explanation_hybrid (any other decision reads as legitimate)
+SUMMARY_TEMPLATES = {
+    "REJECT": "This transaction has been flagged as HIGH RISK (score: {score}/100) and should be blocked immediately due to multiple fraud indicators.",
+    "STEP-UP": "This transaction shows MEDIUM RISK signals (score: {score}/100) and requires additional verification before processing."
+}
+DEFAULT_SUMMARY_TEMPLATE = "This transaction appears LEGITIMATE (score: {score}/100) with all fraud checks passing normally."
+
+# Rule severity indexed by (score >= HIGH_SEVERITY_SCORE)
+HIGH_SEVERITY_SCORE = 35
+SEVERITY = ('MEDIUM', 'HIGH')
+
+
+@lru_cache(maxsize=64)
+def _pretty_rule_name(condition_name):
+    """'location_suspicious' -> 'Location Suspicious' (condition names come from a small fixed set)"""
+    return condition_name.replace('_', ' ').title()
+
+
 def generate_explanation_hybrid(transaction_data, scoring_breakdown, camara_data):
     """
     Generate human-readable explanation for the hybrid scoring decision
@@ -228,12 +409,7 @@ def generate_explanation_hybrid(transaction_data, scoring_breakdown, camara_data
     decision = scoring_breakdown['decision']
     final_score = scoring_breakdown['final_score']
     
-    if decision == "REJECT":
-        explanation['summary'] = f"This transaction has been flagged as HIGH RISK (score: {final_score}/100) and should be blocked immediately due to multiple fraud indicators."
-    elif decision == "STEP-UP":
-        explanation['summary'] = f"This transaction shows MEDIUM RISK signals (score: {final_score}/100) and requires additional verification before processing."
-    else:
-        explanation['summary'] = f"This transaction appears LEGITIMATE (score: {final_score}/100) with all fraud checks passing normally."
+    explanation['summary'] = SUMMARY_TEMPLATES.get(decision, DEFAULT_SUMMARY_TEMPLATE).format(score=final_score)
     
     # Add factors
     if scoring_breakdown.get('sim_swap_flag'):
@@ -252,13 +428,14 @@ def generate_explanation_hybrid(transaction_data, scoring_breakdown, camara_data
         explanation['factors'].append("Registered device is currently offline")
     
     # Add triggered conditions as rules
-    for condition in scoring_breakdown.get('triggered_conditions', []):
-        rule_entry = {
-            'rule': condition['condition'].replace('_', ' ').title(),
-            'severity': 'HIGH' if condition['score'] >= 35 else 'MEDIUM',
+    explanation['triggered_rules'] = [
+        {
+            'rule': _pretty_rule_name(condition['condition']),
+            'severity': SEVERITY[condition['score'] >= HIGH_SEVERITY_SCORE],
             'impact': f"+{condition['score']} risk score",
             'description': condition['description']
         }
-        explanation['triggered_rules'].append(rule_entry)
+        for condition in scoring_breakdown.get('triggered_conditions', ())
+    ]
     
     return explanation
\ No newline at end of file